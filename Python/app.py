@@ -1,67 +1,106 @@
 # Standard library imports
 import os
-import time
-from datetime import datetime
-from dotenv import load_dotenv
+from functools import wraps
 
 # Third-party imports
-from dateutil.relativedelta import relativedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import UserMixin, login_user, login_required, logout_user, current_user
-from flask_sqlalchemy import SQLAlchemy
-from flask_mail import Mail, Message
-from flask_migrate import Migrate
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from sqlalchemy import func, or_
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
 # Local imports
-from extensions import db, login_manager, mail, migrate
-from models import User, Borrower, Loan, RepaymentRecord, Document
-from modules.analytics import bp as analytics_bp
-from modules.borrowers import bp as borrowers_bp
+from extensions import db, login_manager, mail
+from models import User, Borrower, Loan, RepaymentRecord, Document, OcrJob
 from config import config
+from stats import dashboard_stats, admin_analytics_stats, init_stats_cache
+from portfolio import init_portfolio_summary
+from purposes import init_purpose_categories
 from logging_config import setup_logging
 
-def secure_filename_with_timestamp(filename):
-    """Generate a secure filename with timestamp."""
-    base = secure_filename(filename)
-    name, ext = os.path.splitext(base)
-    return f"{name}_{int(time.time())}{ext}"
+# What each process needs: 'web' serves requests, 'worker' runs queue consumers with
+# just the database and write hooks, 'cli' (the default, used by `flask ...`) loads everything
+ROLES = ('web', 'worker', 'cli')
 
-def create_app(config_name=None):
-    """Application factory function."""
+def create_app(config_name=None, role=None):
+    """Application factory function.
+
+    Args:
+        config_name: Key into config (default: FLASK_ENV)
+        role: One of ROLES (default: APP_ROLE, else 'cli'); extensions, blueprints and
+            commands a role does not use are neither imported nor initialized
+    """
     if config_name is None:
         config_name = os.getenv('FLASK_ENV', 'default')
+    role = role or os.getenv('APP_ROLE', 'cli')
+    if role not in ROLES:
+        raise ValueError(f"Unknown role {role!r}; expected one of {', '.join(ROLES)}")
 
     app = Flask(__name__)
     
     # Load configuration
     app.config.from_object(config[config_name])
     config[config_name].validate_config()
+    app.config['APP_ROLE'] = role
     
     # Setup logging
     setup_logging(app)
     
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
-    mail.init_app(app)
+    
+    # Keep the portfolio summary in step with loan/repayment writes
+    init_portfolio_summary(app)
+    
+    # Classify loan purposes on write
+    init_purpose_categories(app)
+    
+    # Read-through cache for dashboard stats, invalidated on loan/repayment/document commits
+    init_stats_cache(app)
+    
+    # Only queue consumers and commands send mail (web requests write to the outbox)
+    if role != 'web':
+        mail.init_app(app)
+    
+    if role == 'cli':
+        init_commands(app)
+    
+    if role == 'worker':
+        return app
+    
     login_manager.init_app(app)
     login_manager.login_view = 'login'
     
-    # Setup rate limiting
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=[f"{app.config['RATELIMIT_MAX_REQUESTS']} per {app.config['RATELIMIT_WINDOW']} seconds"]
-    )
+    # Request hooks are imported here so worker processes never load them
+    from principals import init_principal_cache
+    from sql_profiling import init_sql_profiling
+    from metrics import init_metrics
+    from query_budget import init_query_budget
+    from ratelimit import init_rate_limiting
+    
+    # Flask-Login loads cached id/role/username principals; the full User is fetched on demand
+    init_principal_cache(app, login_manager)
+    
+    # Per-request query count/DB time: Server-Timing header and slow-request log
+    init_sql_profiling(app)
+    
+    # Prometheus request/pool/upload metrics on /metrics (registered before the limiter so 429s are counted)
+    init_metrics(app)
+    
+    # Fail requests over QUERY_BUDGET SQL statements (testing only)
+    init_query_budget(app)
+    
+    # Setup rate limiting (per user/API key, sliding window in RATELIMIT_STORAGE_URI)
+    init_rate_limiting(app)
     
     # Register blueprints
+    from modules.analytics import bp as analytics_bp
+    from modules.borrowers import bp as borrowers_bp
+    from modules.uploads import bp as uploads_bp
     app.register_blueprint(analytics_bp)
     app.register_blueprint(borrowers_bp)
+    app.register_blueprint(uploads_bp)
     
     # Register error handlers
     @app.errorhandler(429)
@@ -89,15 +128,64 @@ def create_app(config_name=None):
 
     return app
 
+def init_commands(app):
+    """Register the maintenance and batch commands (and Flask-Migrate's `flask db`) for the cli role."""
+    from flask_migrate import Migrate
+    from search import init_borrower_search
+    from ocr_queue import init_ocr_queue
+    from upload_store import init_upload_store
+    from bootstrap import init_bootstrap
+    from email_outbox import init_email_outbox
+    from schedules import init_schedules
+    from delinquency import init_delinquency
+    from query_plans import init_query_plans
+    from seed import init_seed
+    from benchmark import init_benchmark
+    
+    # Absolute, so `flask db` and init-db find the migrations from any working directory
+    Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+    
+    # Borrower search index (pg_trgm on Postgres, FTS5 on SQLite), created with the tables
+    init_borrower_search(app)
+    
+    # OCR job queue commands
+    init_ocr_queue(app)
+    
+    # Content-addressed upload store (legacy upload migration and stale upload cleanup commands)
+    init_upload_store(app)
+    
+    # One-shot schema and admin setup command
+    init_bootstrap(app)
+    
+    # Outbox email worker commands
+    init_email_outbox(app)
+    
+    # Repayment schedule generation command
+    init_schedules(app)
+    
+    # Days-past-due / arrears bucket batch
+    init_delinquency(app)
+    
+    # EXPLAIN check for the hot query paths
+    init_query_plans(app)
+    
+    # Synthetic data generator, route and startup benchmark commands
+    init_seed(app)
+    init_benchmark(app)
+
 def register_routes(app):
     """Register all routes with the application"""
+    # Only the web role serves routes, so their helpers are imported here
+    from pagination import keyset_paginate
+    from search import search_borrowers
+    from exports import stream_export
+    from ocr_queue import enqueue_document
+    from notifications import queue_registration_email
+    from principals import principal_cache
+    from upload_store import allowed_file, content_store, store_upload
     # ...existing route definitions (index, login, register, etc)...
     # Move all your existing route handlers here, keeping their code unchanged
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-
     @app.route('/')
     def index():
         if current_user.is_authenticated:
@@ -118,6 +206,7 @@ def register_routes(app):
             
             if user and check_password_hash(user.password_hash, password):
                 login_user(user)
+                principal_cache.set(user.id, user.role, user.username)
                 return redirect(url_for('index'))
             
             flash('Invalid username or password')
@@ -146,18 +235,15 @@ def register_routes(app):
                 username=username,
                 email=email,
                 password_hash=generate_password_hash(password),
-                role='borrower',
-                client_number=User.generate_client_number()
+                role='borrower'
             )
             
             db.session.add(user)
+            # The confirmation email commits with the user and is sent by the email worker
+            queue_registration_email(email, username)
             db.session.commit()
             
-            try:
-                send_registration_email(email, username)
-                flash('Registration successful! Please check your email for confirmation.')
-            except Exception as e:
-                flash('Registration successful! However, email notification could not be sent.')
+            flash('Registration successful! Please check your email for confirmation.')
             
             return redirect(url_for('login'))
         
@@ -178,34 +264,19 @@ def register_routes(app):
             return redirect(url_for('index'))
         
         try:
-            # Get loan statistics
-            stats = {
-                'active_loans': Loan.query.filter_by(status='approved').count(),
-                'total_disbursed': float(db.session.query(func.sum(Loan.amount)).filter_by(status='approved').scalar() or 0),
-                'pending_applications': Loan.query.filter_by(status='pending').count()
-            }
+            # Get loan statistics and distribution in one aggregate query
+            context = dashboard_stats()
             
-            # Get loan distribution data
-            loan_types = ['School Fees', 'Medical', 'Vacation', 'Funeral', 'Customary']
-            loan_distribution = []
-            for loan_type in loan_types:
-                count = Loan.query.filter(
-                    Loan.purpose.ilike(f"%{loan_type.lower()}%")
-                ).count()
-                loan_distribution.append(count)
-            
-            # Get recent applications with user info
+            # Get recent applications with their borrower in the same query
             recent_applications = Loan.query\
-                .join(User)\
+                .options(joinedload(Loan.borrower))\
                 .order_by(Loan.created_at.desc())\
                 .limit(5)\
                 .all()
             
             return render_template('admin/dashboard.html',
-                                stats=stats,
-                                loan_types=loan_types,
-                                loan_distribution=loan_distribution,
-                                recent_applications=recent_applications)
+                                recent_applications=recent_applications,
+                                **context)
                                 
         except Exception as e:
             print(f"Dashboard error: {str(e)}")
@@ -222,7 +293,12 @@ def register_routes(app):
         if current_user.role != 'admin':
             flash('Access denied. Admin privileges required.', 'error')
             return redirect(url_for('index'))
-        users = User.query.all()
+        users = User.query\
+            .options(joinedload(User.borrower))\
+            .order_by(User.id)\
+            .paginate(page=request.args.get('page', 1, type=int),
+                      per_page=app.config['ADMIN_PAGE_SIZE'],
+                      error_out=False)
         return render_template('admin/users.html', users=users)
 
     @app.route('/admin/loans')
@@ -231,7 +307,12 @@ def register_routes(app):
         if current_user.role != 'admin':
             flash('Access denied. Admin privileges required.', 'error')
             return redirect(url_for('index'))
-        loans = Loan.query.all()
+        loans = Loan.query\
+            .options(joinedload(Loan.borrower))\
+            .order_by(Loan.created_at.desc(), Loan.id.desc())\
+            .paginate(page=request.args.get('page', 1, type=int),
+                      per_page=app.config['ADMIN_PAGE_SIZE'],
+                      error_out=False)
         return render_template('admin/loans.html', loans=loans)
 
     @app.route('/admin/analytics')
@@ -242,90 +323,10 @@ def register_routes(app):
             return redirect(url_for('index'))
         
         try:
-            # Enhanced loan statistics
-            total_loans = Loan.query.count()
-            active_loans = Loan.query.filter_by(status='approved').count()
-            total_amount = db.session.query(func.sum(Loan.amount)).filter_by(status='approved').scalar() or 0
-            avg_amount = total_amount / active_loans if active_loans > 0 else 0
-            
-            # Borrower demographics
-            total_borrowers = Borrower.query.count()
-            employment_types = db.session.query(
-                Borrower.employment_type,
-                func.count(Borrower.id)
-            ).group_by(Borrower.employment_type).all()
+            # Loan, repayment, OCR and processing-time statistics in one aggregate query
+            context = admin_analytics_stats()
             
-            # OCR processing statistics
-            documents = Document.query.all()
-            successful_ocr = Document.query.filter_by(ocr_status='completed').count()
-            total_documents = len(documents)
-            avg_ocr_confidence = db.session.query(func.avg(Document.ocr_confidence_score)).scalar() or 0
-            
-            # Repayment statistics
-            total_repayments = RepaymentRecord.query.count()
-            ontime_payments = RepaymentRecord.query.filter_by(is_late_payment=False).count()
-            late_payments = RepaymentRecord.query.filter_by(is_late_payment=True).count()
-            
-            stats = {
-                'active_loans': active_loans,
-                'avg_loan_amount': float(avg_amount),
-                'total_portfolio': float(total_amount),
-                'documents_processed': total_documents,
-                'avg_ocr_confidence': float(avg_ocr_confidence * 100),
-                'ocr_success_rate': (successful_ocr / total_documents * 100) if total_documents > 0 else 0,
-                'total_repayments': total_repayments,
-                'ontime_payment_rate': (ontime_payments / total_repayments * 100) if total_repayments > 0 else 0,
-                'late_payment_rate': (late_payments / total_repayments * 100) if total_repayments > 0 else 0
-            }
-            
-            # Monthly trends (last 6 months)
-            months = []
-            amounts = []
-            for i in range(5, -1, -1):
-                start_date = datetime.utcnow().replace(day=1) - relativedelta(months=i)
-                end_date = (start_date + relativedelta(months=1)).replace(hour=23, minute=59, second=59)
-                
-                month_amount = db.session.query(func.sum(Loan.amount))\
-                    .filter(Loan.created_at.between(start_date, end_date))\
-                    .scalar() or 0
-                    
-                months.append(start_date.strftime('%B'))
-                amounts.append(float(month_amount))
-            
-            # Loan type distribution
-            loan_types = ['School Fees', 'Medical', 'Vacation', 'Funeral', 'Customary']
-            loan_type_distribution = []
-            for loan_type in loan_types:
-                count = Loan.query.filter(
-                    Loan.purpose.ilike(f"%{loan_type.lower()}%")
-                ).count()
-                loan_type_distribution.append(count)
-            
-            # Document processing time distribution
-            processing_times = [0, 0, 0, 0, 0]  # <1s, 1-2s, 2-5s, 5-10s, >10s
-            for doc in documents:
-                if doc.ocr_status == 'completed':
-                    processing_time = (doc.uploaded_at - doc.created_at).total_seconds()
-                    if processing_time < 1:
-                        processing_times[0] += 1
-                    elif processing_time < 2:
-                        processing_times[1] += 1
-                    elif processing_time < 5:
-                        processing_times[2] += 1
-                    elif processing_time < 10:
-                        processing_times[3] += 1
-                    else:
-                        processing_times[4] += 1
-            
-            return render_template(
-                'admin/analytics.html',
-                stats=stats,
-                monthly_labels=months,
-                monthly_amounts=amounts,
-                loan_types=loan_types,
-                loan_type_distribution=loan_type_distribution,
-                processing_time_distribution=processing_times
-            )
+            return render_template('admin/analytics.html', **context)
             
         except Exception as e:
             print(f"Analytics error: {str(e)}")
@@ -347,7 +348,8 @@ def register_routes(app):
                 monthly_amounts=[],
                 loan_types=[],
                 loan_type_distribution=[],
-                processing_time_distribution=[0, 0, 0, 0, 0]
+                processing_time_labels=[],
+                processing_time_distribution=[]
             )
 
     @app.route('/customer-portal')
@@ -400,26 +402,8 @@ def register_routes(app):
                     return redirect(request.url)
                     
                 try:
-                    filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{timestamp}_{filename}"
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    
-                    # Ensure upload directory exists
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    
-                    file.save(file_path)
-                    
-                    document = Document(
-                        user_id=current_user.id,
-                        document_type=document_type,
-                        file_name=filename,
-                        file_path=file_path,
-                        file_url=file_path,
-                        ocr_status='pending'
-                    )
-                    
-                    db.session.add(document)
+                    # Stored once per content hash; re-uploads only add a Document row
+                    store_upload(file, document_type, user_id=current_user.id)
                     db.session.commit()
                     
                     flash('Document uploaded successfully!', 'success')
@@ -449,118 +433,52 @@ def register_routes(app):
                 flash('No selected file', 'error')
                 return redirect(request.url)
             
-            allowed_extensions = {'.pdf', '.png', '.jpg', '.jpeg'}
-            if not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+            if not allowed_file(file.filename):
                 flash('Invalid file type. Please upload PDF or image files.', 'error')
                 return redirect(request.url)
             
             try:
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                
-                file.save(file_path)
-                
-                document = Document(
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    document_type='loan_application',
-                    file_name=filename,
-                    file_path=file_path,
-                    file_url=url_for('static', filename=f'uploads/{filename}', _external=True),
-                    ocr_status='pending',
-                    uploaded_at=datetime.utcnow()
+                document = store_upload(
+                    file,
+                    'loan_application',
+                    user_id=current_user.id if current_user.is_authenticated else None
                 )
+                job = enqueue_document(document)
+                db.session.commit()
                 
-                db.session.add(document)
-                db.session.flush()
-                
-                document.process_ocr()
+                # OCR and record creation run in the ocr-worker pool; the client polls the status URL
+                session['ocr_jobs'] = (session.get('ocr_jobs', []) + [job.id])[-20:]
+                status_url = url_for('upload_application_status', job_id=job.id)
                 
-                if document.ocr_status == 'failed':
-                    flash('Error processing document. Please try again.', 'error')
-                    return redirect(request.url)
+                if request.accept_mimetypes.best == 'application/json':
+                    return jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url}), 202, {'Location': status_url}
                 
-                if document.ocr_status == 'completed' and document.extracted_data:
-                    loan = Loan(
-                        user_id=current_user.id,
-                        status='pending',
-                        amount=0,  # Will be updated later
-                        purpose='pending review'
-                    )
-                    db.session.add(loan)
-                    db.session.flush()
-                    
-                    document.loan_id = loan.id
-                    
-                    if document.extracted_data:
-                        try:
-                            # Update or create borrower
-                            borrower = Borrower.query.filter_by(user_id=current_user.id).first()
-                            if not borrower:
-                                borrower = Borrower(
-                                    user_id=current_user.id,
-                                    full_name=f"{document.extracted_data.get('surname', '')} {document.extracted_data.get('given_name', '')}",
-                                    email=document.extracted_data.get('email', ''),
-                                    phone=document.extracted_data.get('mobile_number', ''),
-                                    position=document.extracted_data.get('position', ''),
-                                    department=document.extracted_data.get('company_department', ''),
-                                    employer_name=document.extracted_data.get('paymaster', '')
-                                )
-                                db.session.add(borrower)
-
-                            db.session.commit()
-                            
-                            # Create user account if not authenticated
-                            if not current_user.is_authenticated:
-                                # Generate a username from email or use a timestamp
-                                email = document.extracted_data.get('email', '')
-                                username = email.split('@')[0] if email else f'user_{int(datetime.now().timestamp())}'
-                                
-                                # Create new user
-                                user = User(
-                                    username=username,
-                                    email=email,
-                                    password_hash=generate_password_hash('password1234'),  # Temporary password
-                                    role='borrower',
-                                    client_number=User.generate_client_number(),
-                                    is_application_created=True
-                                )
-                                db.session.add(user)
-                                db.session.commit()
-                                
-                                # Update document with user_id
-                                document.user_id = user.id
-                                db.session.commit()
-                                
-                                # Send registration email
-                                try:
-                                    send_registration_email(email, username, is_application=True)
-                                except Exception as e:
-                                    print(f"Failed to send registration email: {str(e)}")
-                                
-                                # Log in the user
-                                login_user(user)
-                            
-                            flash('Application submitted successfully! Please upload your supporting documents.', 'success')
-                            return redirect(url_for('upload_documents'))  # This should now work with login_required
-                            
-                        except Exception as e:
-                            db.session.rollback()
-                            print(f"Error saving application details: {str(e)}")
-                            flash('Error saving application details. Please try again.', 'error')
-                            return redirect(request.url)
-                else:
-                    flash('Could not extract data from document. Please try again.', 'error')
-                    return redirect(request.url)
+                flash('Application received! We are processing your document.', 'success')
+                return redirect(status_url)
                     
             except Exception as e:
-                print(f"Error processing file: {str(e)}")
+                db.session.rollback()
+                app.logger.error(f"Error queueing application: {str(e)}")
                 flash('Error processing file. Please try again.', 'error')
                 return redirect(request.url)
         
         return render_template('customer/upload_application.html')
 
+    @app.route('/upload-application/jobs/<int:job_id>')
+    def upload_application_status(job_id):
+        job = db.session.get(OcrJob, job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        # Visible to the session that uploaded it, the owning user and admins
+        owns_job = job_id in session.get('ocr_jobs', [])
+        if current_user.is_authenticated:
+            owns_job = owns_job or job.document.user_id == current_user.id or current_user.role == 'admin'
+        if not owns_job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify(job.to_dict())
+
     @app.route('/upload', methods=['POST'])
     @login_required
     def upload_file():
@@ -578,19 +496,16 @@ def register_routes(app):
                 app.logger.warning(f"Invalid file type: {file.filename}")
                 return jsonify({"error": "Invalid file type"}), 400
                 
-            filename = secure_filename_with_timestamp(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Ensure upload directory exists
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            # Save file
-            file.save(filepath)
-            app.logger.info(f"File uploaded successfully: {filename}")
+            stored = content_store().save(file.stream)
+            filename = secure_filename(file.filename)
+            app.logger.info(f"File uploaded successfully: {filename} ({stored.digest})")
             
             return jsonify({
                 "message": "File uploaded successfully",
-                "filename": filename
+                "filename": filename,
+                "sha256": stored.digest,
+                "size": stored.size,
+                "deduplicated": not stored.created
             }), 200
             
         except Exception as e:
@@ -606,6 +521,21 @@ def register_routes(app):
             return jsonify({'message': 'Invalid or missing API key'}), 401
         return decorated
 
+    def cursor_page(query, model):
+        """Serve a keyset page when the client asks for cursor mode (`after` present)."""
+        items, pagination = keyset_paginate(
+            query,
+            model,
+            after=request.args.get('after') or None,
+            limit=min(int(request.args.get('limit', 10)), app.config['API_MAX_PAGE_SIZE']),
+            order=request.args.get('order', 'id'),
+            with_total=request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+        )
+        return jsonify({
+            'data': [item.to_dict() for item in items],
+            'pagination': pagination
+        })
+
     # API endpoints
     @app.route('/api/v1/loans', methods=['GET'])
     @require_api_key
@@ -619,7 +549,10 @@ def register_routes(app):
             if status:
                 query = query.filter_by(status=status)
 
-            loans = query.paginate(page=page, per_page=per_page)
+            if 'after' in request.args:
+                return cursor_page(query, Loan)
+
+            loans = query.paginate(page=page, per_page=per_page, max_per_page=app.config['API_MAX_PAGE_SIZE'])
             
             return jsonify({
                 'data': [loan.to_dict() for loan in loans.items],
@@ -629,6 +562,8 @@ def register_routes(app):
                     'total': loans.total
                 }
             })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -642,14 +577,12 @@ def register_routes(app):
 
             query = Borrower.query
             if search:
-                query = query.filter(
-                    or_(
-                        Borrower.full_name.ilike(f'%{search}%'),
-                        Borrower.email.ilike(f'%{search}%')
-                    )
-                )
+                query = search_borrowers(query, search)
+
+            if 'after' in request.args:
+                return cursor_page(query, Borrower)
 
-            borrowers = query.paginate(page=page, per_page=per_page)
+            borrowers = query.paginate(page=page, per_page=per_page, max_per_page=app.config['API_MAX_PAGE_SIZE'])
             
             return jsonify({
                 'data': [borrower.to_dict() for borrower in borrowers.items],
@@ -659,47 +592,33 @@ def register_routes(app):
                     'total': borrowers.total
                 }
             })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
-# Create the application instance
-app = create_app()
+    @app.route('/api/v1/export/<dataset>', methods=['GET'])
+    @require_api_key
+    def api_export(dataset):
+        """Stream loans, borrowers or repayments as CSV or NDJSON."""
+        try:
+            return stream_export(
+                dataset,
+                fmt=request.args.get('format', 'csv'),
+                status=request.args.get('status'),
+                date_from=request.args.get('from'),
+                date_to=request.args.get('to'),
+                compress=request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
 if __name__ == '__main__':
-    with app.app_context():
-        retry_count = 3
-        while retry_count > 0:
-            try:
-                app.logger.info("Creating database tables...")
-                db.create_all()
-                
-                app.logger.info("Checking for admin user...")
-                admin = User.query.filter_by(username='DevAdmin').first()
-                if not admin:
-                    app.logger.info("Creating admin user...")
-                    admin = User(
-                        username='DevAdmin',
-                        email='admin@knrfinancial.com',
-                        full_name='System Administrator',
-                        password_hash=generate_password_hash('password1234'),
-                        role='admin',
-                        client_number=User.generate_client_number()
-                    )
-                    db.session.add(admin)
-                    db.session.commit()
-                    app.logger.info("Admin user created successfully")
-                
-                app.logger.info("Starting Flask application...")
-                app.run(
-                    host=app.config.get('HOST', '0.0.0.0'),
-                    port=app.config.get('PORT', 5000),
-                    debug=app.config.get('DEBUG', False)
-                )
-                break
-                
-            except Exception as e:
-                retry_count -= 1
-                app.logger.error(f"Error during initialization (attempts left: {retry_count}): {str(e)}")
-                if retry_count == 0:
-                    raise
-                time.sleep(5)
+    # Development server only; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
+    # and sets up the schema once with `flask init-db`
+    app = create_app()
+    app.run(
+        host=app.config.get('HOST', '0.0.0.0'),
+        port=app.config.get('PORT', 5000),
+        debug=app.config.get('DEBUG', False)
+    )
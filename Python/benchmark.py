@@ -0,0 +1,218 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from extensions import db
+from models import User, Borrower, Loan, RepaymentRecord, Document
+
+# Routes with side effects that must not be replayed
+SKIP_ENDPOINTS = {'static', 'logout'}
+
+
+def benchmark_rules(app):
+    """GET routes without URL arguments, i.e. every page and API listing we can call blind."""
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint):
+        if rule.endpoint in SKIP_ENDPOINTS or rule.arguments or 'GET' not in rule.methods:
+            continue
+        yield rule
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _row_counts():
+    return {
+        model.__tablename__: db.session.query(func.count(model.id)).scalar()
+        for model in (User, Borrower, Loan, RepaymentRecord, Document)
+    }
+
+
+def run_benchmark(iterations=20, warmup=2, admin=None):
+    """Time every benchmarkable route through the test client.
+
+    Args:
+        iterations: Timed requests per route
+        warmup: Untimed requests per route first (fills caches and pools)
+        admin: Username to log in as for admin pages (default: first admin user)
+
+    Returns:
+        dict with 'meta' (row counts, dialect, host) and per-endpoint 'routes' timings in ms
+    """
+    app = current_app._get_current_object()
+    admin_user = User.query.filter_by(username=admin).first() if admin \
+        else User.query.filter_by(role='admin').order_by(User.id).first()
+    headers = {'X-API-Key': os.getenv('API_KEY', '')}
+
+    client = app.test_client()
+    if admin_user is not None:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin_user.id)
+            session['_fresh'] = True
+
+    routes = {}
+    for rule in benchmark_rules(app):
+        samples = []
+        status = None
+        for i in range(warmup + iterations):
+            started = time.perf_counter()
+            response = client.get(rule.rule, headers=headers)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            status = response.status_code
+            if i >= warmup:
+                samples.append(elapsed)
+        routes[rule.endpoint] = {
+            'path': rule.rule,
+            'status': status,
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'p50_ms': round(_percentile(samples, 50), 3),
+            'p95_ms': round(_percentile(samples, 95), 3),
+            'max_ms': round(max(samples), 3),
+        }
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'dialect': db.engine.dialect.name,
+            'python': platform.python_version(),
+            'iterations': iterations,
+            'rows': _row_counts(),
+        },
+        'routes': routes,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """Return (endpoint, baseline p50, current p50) for routes slower than baseline by more than `tolerance`."""
+    regressions = []
+    for endpoint, result in current['routes'].items():
+        before = baseline.get('routes', {}).get(endpoint)
+        if before and result['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append((endpoint, before['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+# Runs in a fresh interpreter: import and build the app for a role, then serve one request
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app(role=sys.argv[1])
+created = time.perf_counter()
+app.test_client().get(sys.argv[2]).get_data()
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'total_ms': (served - started) * 1000}))
+"""
+
+
+def _startup_run(role, path, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', STARTUP_SCRIPT, role, path]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f'Startup run failed:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def _slowest_imports(importtime_log, top):
+    """Top-level imports by cumulative time from `python -X importtime` output."""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown as two spaces per level; keep modules imported by our own code
+        if len(name) - len(name.lstrip()) <= 3:
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def run_startup_benchmark(role='web', path='/metrics', runs=5, top=15):
+    """Time a cold start (import + create_app + first request) in fresh interpreters.
+
+    Args:
+        role: Process role to build the app for
+        path: Path of the first request (its status does not matter, only the time to answer)
+        runs: Cold starts to take the median of
+        top: Slowest top-level imports to report, from one extra `-X importtime` run
+
+    Returns:
+        dict with the median timings in ms and the slowest imports
+    """
+    samples = [_startup_run(role, path)[0] for _ in range(runs)]
+    _, importtime_log = _startup_run(role, path, importtime=True)
+    return {
+        'role': role,
+        'path': path,
+        'runs': runs,
+        **{key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]},
+        'slowest_imports': _slowest_imports(importtime_log, top),
+    }
+
+
+@click.command('benchmark-startup')
+@click.option('--role', default='web', show_default=True, type=click.Choice(['web', 'worker', 'cli']))
+@click.option('--path', default='/metrics', show_default=True, help='First request to serve.')
+@click.option('--runs', default=5, show_default=True)
+@click.option('--top', default=15, show_default=True, help='Slowest imports to list.')
+@click.option('--budget-ms', type=float, default=None, help="Fail above this (default: the role's STARTUP_BUDGET_MS).")
+@with_appcontext
+def benchmark_startup_command(role, path, runs, top, budget_ms):
+    """Measure cold start to first request and fail when it exceeds the budget."""
+    budget_ms = budget_ms or current_app.config['STARTUP_BUDGET_MS'][role]
+    results = run_startup_benchmark(role=role, path=path, runs=runs, top=top)
+    click.echo(f"{role} cold start (median of {runs}): import {results['import_ms']:.0f}ms, "
+               f"create_app {results['create_ms']:.0f}ms, first request {results['first_request_ms']:.0f}ms, "
+               f"total {results['total_ms']:.0f}ms (budget {budget_ms:.0f}ms)")
+    for name, ms in results['slowest_imports']:
+        click.echo(f"{ms:9.1f}ms  {name}")
+    if results['total_ms'] > budget_ms:
+        click.echo(f"REGRESSION startup: {results['total_ms']:.0f}ms > {budget_ms:.0f}ms")
+        sys.exit(1)
+
+
+@click.command('benchmark-routes')
+@click.option('--iterations', default=20, show_default=True)
+@click.option('--warmup', default=2, show_default=True)
+@click.option('--admin', default=None, help='Username for admin pages (default: first admin).')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON results here.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Fail on regressions against this file.')
+@click.option('--tolerance', default=0.2, show_default=True, help='Allowed p50 slowdown vs the baseline.')
+@with_appcontext
+def benchmark_routes_command(iterations, warmup, admin, output, baseline, tolerance):
+    """Time every GET route at the current data volume and optionally diff against a baseline."""
+    results = run_benchmark(iterations=iterations, warmup=warmup, admin=admin)
+    click.echo(f"Rows: {results['meta']['rows']}")
+    for endpoint, result in results['routes'].items():
+        click.echo(f"{endpoint:40} {result['status']}  p50 {result['p50_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        click.echo(f'Results written to {output}')
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(json.load(f), results, tolerance)
+        for endpoint, before, after in regressions:
+            click.echo(f"REGRESSION {endpoint}: p50 {before:.2f}ms -> {after:.2f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+def init_benchmark(app):
+    """Register the route and startup benchmark commands."""
+    app.cli.add_command(benchmark_routes_command)
+    app.cli.add_command(benchmark_startup_command)
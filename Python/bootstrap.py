@@ -0,0 +1,78 @@
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models import User
+from portfolio import get_summary, reconcile_summary
+
+# Root of the migration chain: the tables that existed before migrations were added
+BASELINE_REVISION = '0b7e4c2d9a15'
+
+
+def create_admin(username='DevAdmin', email='admin@knrfinancial.com', password=None):
+    """Create the initial admin account unless a user with `username` exists. Returns True if created."""
+    if User.query.filter_by(username=username).first():
+        return False
+    admin = User(
+        username=username,
+        email=email,
+        password_hash=generate_password_hash(password or os.getenv('ADMIN_PASSWORD', 'password1234')),
+        role='admin'
+    )
+    db.session.add(admin)
+    db.session.commit()
+    return True
+
+
+def migrate_schema():
+    """Upgrade the database to the latest migration.
+
+    Databases built by db.create_all() have tables but no alembic_version. They are
+    stamped at the baseline first; the later revisions skip what already exists and
+    add the rest (e.g. the search index and the summary row).
+    """
+    inspector = inspect(db.engine)
+    if inspector.has_table('user') and not inspector.has_table('alembic_version'):
+        current_app.logger.info(f"Unversioned schema found; stamping baseline revision {BASELINE_REVISION}")
+        stamp(revision=BASELINE_REVISION)
+    upgrade()
+
+
+@click.command('init-db')
+@click.option('--retries', default=3, show_default=True, help='Attempts while the database is still starting.')
+@click.option('--admin-username', default='DevAdmin', show_default=True)
+@click.option('--admin-email', default='admin@knrfinancial.com', show_default=True)
+@with_appcontext
+def init_db_command(retries, admin_username, admin_email):
+    """Apply database migrations and create the initial admin user. Run once per deploy, before starting gunicorn."""
+    for attempt in range(1, retries + 1):
+        try:
+            current_app.logger.info("Applying database migrations...")
+            migrate_schema()
+
+            # The portfolio_summary migration seeds this row, unless the table predates it
+            if get_summary() is None:
+                reconcile_summary()
+
+            current_app.logger.info("Checking for admin user...")
+            if create_admin(admin_username, admin_email):
+                click.echo(f'Admin user {admin_username} created.')
+            click.echo('Database initialised.')
+            return
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error during initialization (attempts left: {retries - attempt}): {str(e)}")
+            if attempt == retries:
+                raise
+            time.sleep(5)
+
+
+def init_bootstrap(app):
+    """Register the one-shot database setup command."""
+    app.cli.add_command(init_db_command)
@@ -0,0 +1,197 @@
+import csv
+import io
+import os
+import uuid
+from datetime import date, datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from bulk import bulk_insert
+from models import User, Borrower
+
+REQUIRED_FIELDS = ['surname', 'given_name', 'email']
+
+
+def _text(row, key):
+    value = (row.get(key) or '').strip()
+    return value or None
+
+
+def _date(row, key):
+    value = _text(row, key)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a date in YYYY-MM-DD format")
+
+
+def map_row(row, now):
+    """Validate one payroll CSV row and map it onto borrowers columns.
+
+    Raises:
+        ValueError: If the row cannot be imported
+    """
+    missing = [key for key in REQUIRED_FIELDS if not _text(row, key)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    date_employed = _date(row, 'date_employed')
+    employment_duration = None
+    if date_employed:
+        employment_duration = (now.year - date_employed.year) * 12 + now.month - date_employed.month
+        if now.day < date_employed.day:
+            employment_duration -= 1
+
+    address = ' '.join(filter(None, [
+        _text(row, 'lot'), _text(row, 'section'), _text(row, 'street_name'), _text(row, 'suburb')
+    ]))
+
+    return {
+        'full_name': f"{_text(row, 'surname')} {_text(row, 'given_name')}",
+        'date_of_birth': _date(row, 'date_of_birth'),
+        'gender': _text(row, 'gender'),
+        'marital_status': _text(row, 'marital_status'),
+        'email': _text(row, 'email'),
+        'phone': _text(row, 'mobile_number'),
+        'address': address or _text(row, 'postal_address'),
+        'city': _text(row, 'suburb'),
+        'employer_name': _text(row, 'paymaster'),
+        'employment_duration': employment_duration,
+        'position': _text(row, 'position'),
+        'department': _text(row, 'company_department'),
+        'bank_name': _text(row, 'bank_name'),
+        'account_number': _text(row, 'account_number'),
+        'bsb_code': _text(row, 'bsb_code'),
+        'account_type': _text(row, 'account_type'),
+        'status': 'active',
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+class RejectReport:
+    """CSV report of rejected rows, created on the first rejection."""
+
+    def __init__(self, folder, fieldnames):
+        self.folder = folder
+        self.fieldnames = ['line', 'error'] + list(fieldnames or [])
+        self.filename = None
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line, row, error):
+        if self._writer is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self.filename = f"borrower_import_{uuid.uuid4().hex}.csv"
+            self._file = open(os.path.join(self.folder, self.filename), 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({**row, 'line': line, 'error': error})
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class BorrowerImporter:
+    """Stream a payroll CSV into the borrowers table in fixed-size batches.
+
+    Rows are read one at a time, validated and matched to user accounts by email
+    once per batch, then written with a single bulk statement and committed, so a
+    bad row only rejects itself and memory use does not grow with the file.
+    """
+
+    def __init__(self, batch_size=1000, report_folder='uploads/import_reports'):
+        self.batch_size = batch_size
+        self.report_folder = report_folder
+
+    def run(self, stream):
+        """Import a binary CSV stream.
+
+        Returns:
+            dict with 'imported', 'rejected' and 'report' (report filename or None)
+        """
+        text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text_stream)
+        report = RejectReport(self.report_folder, reader.fieldnames)
+        imported = 0
+
+        try:
+            batch = []
+            for row in reader:
+                batch.append((reader.line_num, row))
+                if len(batch) >= self.batch_size:
+                    imported += self._flush(batch, report)
+                    batch = []
+            if batch:
+                imported += self._flush(batch, report)
+        except (UnicodeDecodeError, csv.Error) as e:
+            report.add(reader.line_num, {}, f"Unreadable CSV: {str(e)}")
+        finally:
+            report.close()
+            text_stream.detach()
+
+        return {'imported': imported, 'rejected': report.count, 'report': report.filename}
+
+    def _flush(self, batch, report):
+        now = datetime.utcnow()
+        valid = []
+        for line, row in batch:
+            try:
+                valid.append((line, row, map_row(row, now)))
+            except ValueError as e:
+                report.add(line, row, str(e))
+
+        if not valid:
+            return 0
+
+        # Resolve user accounts and existing borrowers for the whole batch at once
+        emails = {values['email'] for _, _, values in valid}
+        users = dict(
+            db.session.query(User.email, User.id)
+            .filter(User.email.in_(emails))
+            .all()
+        )
+        taken = {
+            user_id for (user_id,) in db.session.query(Borrower.user_id)
+            .filter(Borrower.user_id.in_(list(users.values())))
+        }
+
+        rows = []
+        accepted = []
+        for line, row, values in valid:
+            user_id = users.get(values['email'])
+            if user_id is None:
+                report.add(line, row, 'No user account with this email')
+            elif user_id in taken:
+                report.add(line, row, 'Borrower already exists for this user')
+            else:
+                taken.add(user_id)
+                rows.append({**values, 'user_id': user_id})
+                accepted.append((line, row))
+
+        if not rows:
+            return 0
+
+        try:
+            bulk_insert(Borrower.__table__, rows)
+            db.session.commit()
+            return len(rows)
+        except Exception:
+            db.session.rollback()
+
+        # Fall back to row-by-row inserts so one conflicting row doesn't sink the batch
+        imported = 0
+        for (line, row), values in zip(accepted, rows):
+            try:
+                db.session.execute(insert(Borrower.__table__), [values])
+                db.session.commit()
+                imported += 1
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                report.add(line, row, f"Database error: {e.__class__.__name__}")
+        return imported
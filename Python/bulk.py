@@ -0,0 +1,59 @@
+import csv
+import io
+from sqlalchemy import insert
+from extensions import db
+
+PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+
+def copy_rows(table, rows):
+    """Insert rows with COPY ... FROM STDIN on the session's psycopg2 connection."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+
+    raw = db.session.connection().connection.dbapi_connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+
+def executemany_rows(table, rows):
+    """Insert rows with one DBAPI executemany, skipping SQLAlchemy's per-row parameter processing."""
+    columns = list(rows[0])
+    dialect = db.session.get_bind().dialect
+    placeholder = PLACEHOLDERS.get(dialect.paramstyle)
+    if placeholder is None:
+        db.session.execute(insert(table), rows)
+        return
+
+    quote = dialect.identifier_preparer.quote
+    statement = (
+        f"INSERT INTO {quote(table.name)} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+    db.session.connection().exec_driver_sql(
+        statement,
+        [tuple(row[column] for column in columns) for row in rows]
+    )
+
+
+def bulk_insert(table, rows):
+    """Insert a list of column dicts into `table` in one round trip.
+
+    Uses COPY on psycopg2 and a single executemany everywhere else. Values go to
+    the driver as-is, so rows must carry DBAPI-native values for every column
+    (column defaults are not applied).
+    """
+    if not rows:
+        return
+    if db.session.get_bind().dialect.driver == 'psycopg2':
+        copy_rows(table, rows)
+    else:
+        executemany_rows(table, rows)
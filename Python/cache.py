@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+MISSING = object()
+
+
+class MemoryBackend:
+    """In-process stand-in for a shared cache backend (used in tests and single-process setups)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set `key` only if it is absent; returns True when it was set."""
+        if self.get(key) is not None:
+            return False
+        with self._lock:
+            if key in self._data:
+                return False
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisBackend:
+    """Shared backend on Redis. Values are stored as JSON."""
+
+    def __init__(self, url, prefix='stats:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('STATS_CACHE_URL is set but the redis package is not installed')
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self._client.set(self._prefix + key, json.dumps(value), ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self._prefix + key for key in keys])
+
+
+class StatsCache:
+    """Read-through cache for dashboard stats blocks.
+
+    Entries live in an in-process LRU and, when configured, a shared backend. Each
+    key has its own TTL. With a shared backend, local entries are additionally capped
+    at `local_ttl` seconds so invalidations made by other processes are picked up.
+    A per-key lock (thread lock plus a backend lock key) makes sure a cold key is
+    recomputed once while concurrent callers wait for the result.
+    """
+
+    def __init__(self, maxsize=128, default_ttl=60, ttls=None, backend=None,
+                 local_ttl=5, lock_timeout=10, enabled=True):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.backend = backend
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        self.enabled = enabled
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def init_app(self, app):
+        """Configure the cache from STATS_CACHE_* settings."""
+        url = app.config.get('STATS_CACHE_URL')
+        self.backend = RedisBackend(url) if url else None
+        self.enabled = app.config.get('STATS_CACHE_ENABLED', True)
+        self.maxsize = app.config.get('STATS_CACHE_MAXSIZE', self.maxsize)
+        self.default_ttl = app.config.get('STATS_CACHE_DEFAULT_TTL', self.default_ttl)
+        self.ttls = dict(app.config.get('STATS_CACHE_TTLS', {}))
+        self.local_ttl = app.config.get('STATS_CACHE_LOCAL_TTL', self.local_ttl)
+        self.lock_timeout = app.config.get('STATS_CACHE_LOCK_TIMEOUT', self.lock_timeout)
+        self.clear()
+        app.extensions['stats_cache'] = self
+
+    def ttl_for(self, key):
+        return self.ttls.get(key, self.default_ttl)
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _local_set(self, key, value, ttl):
+        if self.backend is not None:
+            ttl = min(ttl, self.local_ttl)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for `key` or MISSING."""
+        if not self.enabled:
+            return MISSING
+        value = self._local_get(key)
+        if value is MISSING and self.backend is not None:
+            shared = self.backend.get(key)
+            if shared is not None:
+                value = shared
+                self._local_set(key, value, self.ttl_for(key))
+        if value is MISSING:
+            self.misses[key] += 1
+        else:
+            self.hits[key] += 1
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        ttl = self.ttl_for(key)
+        self._local_set(key, value, ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(*keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.hits.clear()
+        self.misses.clear()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _wait_for_shared(self, key):
+        """Poll the backend while another process recomputes `key`."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            value = self.backend.get(key)
+            if value is not None:
+                self._local_set(key, value, self.ttl_for(key))
+                return value
+            time.sleep(0.05)
+        return MISSING
+
+    def get_or_compute_many(self, keys, compute):
+        """Return {key: value} for `keys`, computing all misses with one `compute(missing)` call.
+
+        `compute` receives the list of missing keys and must return a dict covering them.
+        """
+        keys = list(keys)
+        values = {key: self.get(key) for key in keys}
+        missing = sorted(key for key, value in values.items() if value is MISSING)
+        if not missing or not self.enabled:
+            if missing:
+                values.update(compute(missing))
+            return values
+
+        # Lock in sorted order so overlapping key sets cannot deadlock
+        locks = [self._key_lock(key) for key in missing]
+        for lock in locks:
+            lock.acquire()
+        shared_locks = []
+        try:
+            still_missing = []
+            for key in missing:
+                value = self._local_get(key)
+                if value is MISSING and self.backend is not None:
+                    if self.backend.add(f'lock:{key}', 1, self.lock_timeout):
+                        shared_locks.append(f'lock:{key}')
+                    else:
+                        value = self._wait_for_shared(key)
+                if value is MISSING:
+                    still_missing.append(key)
+                else:
+                    values[key] = value
+
+            if still_missing:
+                computed = compute(still_missing)
+                for key in still_missing:
+                    self.set(key, computed[key])
+                    values[key] = computed[key]
+        finally:
+            if shared_locks:
+                self.backend.delete(*shared_locks)
+            for lock in reversed(locks):
+                lock.release()
+
+        return values
+
+    def stats(self):
+        """Hit/miss counters per key plus totals."""
+        return {
+            'hits': sum(self.hits.values()),
+            'misses': sum(self.misses.values()),
+            'entries': len(self._entries),
+            'keys': {
+                key: {'hits': self.hits[key], 'misses': self.misses[key]}
+                for key in sorted(set(self.hits) | set(self.misses))
+            },
+        }
@@ -6,15 +6,19 @@ class Config:
     """Base configuration class."""
     # Server
     PORT = int(os.getenv('PORT', 5000))
+    APP_BASE_URL = os.getenv('APP_BASE_URL', 'http://localhost:5000')
     
     # Database
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://postgres@localhost:5050/postgres')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # DB_MAX_CONNECTIONS/DB_MAX_OVERFLOW are budgets for the whole deployment; each of the
+    # WEB_CONCURRENCY worker processes (set by gunicorn.conf.py) gets an equal share
+    DB_POOL_PROCESSES = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': int(os.getenv('DB_MAX_CONNECTIONS', 20)),
+        'pool_size': max(1, int(os.getenv('DB_MAX_CONNECTIONS', 20)) // DB_POOL_PROCESSES),
         'pool_recycle': 3600,
         'pool_pre_ping': True,
-        'max_overflow': 5,
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)) // DB_POOL_PROCESSES,
         'pool_timeout': int(os.getenv('DB_IDLE_TIMEOUT', 30000)) / 1000  # Convert to seconds
     }
 
@@ -35,15 +39,95 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+    # Uploads are stored once per SHA-256 under <ab>/<cd>/<digest> here
+    UPLOAD_STORE_FOLDER = os.getenv('UPLOAD_STORE_FOLDER', os.path.join(UPLOAD_FOLDER, 'blobs'))
+    # Resumable uploads: chunks of at most UPLOAD_CHUNK_SIZE bytes are PUT straight to disk
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 100 * 1024 * 1024))
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))  # seconds without a chunk before GC
+    UPLOAD_CHUNK_TIMEOUT = int(os.getenv('UPLOAD_CHUNK_TIMEOUT', 300))  # seconds before a stuck chunk PUT is taken over
+    
+    # OCR job queue
+    OCR_WORKER_PROCESSES = int(os.getenv('OCR_WORKER_PROCESSES', os.cpu_count() or 2))
+    OCR_POLL_INTERVAL = float(os.getenv('OCR_POLL_INTERVAL', 2))
+    OCR_VISIBILITY_TIMEOUT = int(os.getenv('OCR_VISIBILITY_TIMEOUT', 300))  # seconds
+    OCR_MAX_ATTEMPTS = int(os.getenv('OCR_MAX_ATTEMPTS', 3))
+    OCR_RETRY_BACKOFF = int(os.getenv('OCR_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+    # Tesseract language and the resolution PDF pages are rendered at before OCR
+    OCR_LANGUAGE = os.getenv('OCR_LANGUAGE', 'eng')
+    OCR_DPI = int(os.getenv('OCR_DPI', 300))
+    
+    # Upper edges (seconds) of the OCR processing-time histogram buckets on /admin/analytics
+    OCR_PROCESSING_TIME_BUCKETS = [1, 2, 5, 10]
+    
+    # Rows fetched per server-side cursor batch by /api/v1/export
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+    
+    # Rows per page on the admin loan and user listings
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 50))
+    
+    # Upper bound on the `limit` query parameter of the /api/v1 listings
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 100))
+    
+    # Per-request SQL profiling: Server-Timing header and slow-request log
+    SQL_PROFILING_ENABLED = os.getenv('SQL_PROFILING_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    SLOW_REQUEST_THRESHOLD_MS = float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    
+    # Cold start budget per role (import + create_app + first request) checked by `flask benchmark-startup`.
+    # Importing Flask and SQLAlchemy alone takes ~550ms on a single-core host; the cli role also loads Alembic
+    STARTUP_BUDGET_MS = {'web': 1000, 'worker': 850, 'cli': 1300}
+    
+    # Maximum SQL statements per request; exceeding it raises QueryBudgetExceeded (None disables the check)
+    QUERY_BUDGET = None
+    
+    # Dashboard stats cache: per-block TTLs in seconds; STATS_CACHE_URL (redis://...) shares it across processes
+    STATS_CACHE_ENABLED = os.getenv('STATS_CACHE_ENABLED', 'true').lower() == 'true'
+    STATS_CACHE_URL = os.getenv('STATS_CACHE_URL')
+    STATS_CACHE_MAXSIZE = 128
+    STATS_CACHE_DEFAULT_TTL = 60
+    STATS_CACHE_TTLS = {
+        'portfolio_totals': 30,
+        'repayment_rates': 60,
+        'monthly_trend': 300,
+        'type_distribution': 120,
+        'document_stats': 60,
+    }
+    STATS_CACHE_LOCAL_TTL = 5  # cap on in-process copies when a shared backend is used
+    STATS_CACHE_LOCK_TIMEOUT = 10
+    
+    # Per-process cache of logged-in user principals; the TTL bounds how long other workers see an old role
+    USER_CACHE_ENABLED = os.getenv('USER_CACHE_ENABLED', 'true').lower() == 'true'
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 30))
+    USER_CACHE_MAXSIZE = 10000
+    
+    # Days-past-due edges of the arrears buckets (current, 1-29, 30-59, 60-89, 90+)
+    DELINQUENCY_BUCKETS = [30, 60, 90]
+    
+    # Vintage analysis: Parquet/Feather cache location (default: <instance folder>/vintage) and curve length
+    VINTAGE_CACHE_FOLDER = os.getenv('VINTAGE_CACHE_FOLDER')
+    VINTAGE_MAX_MONTHS_ON_BOOK = int(os.getenv('VINTAGE_MAX_MONTHS_ON_BOOK', 24))
+    
+    # Bulk borrower import
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+    IMPORT_REPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'import_reports')
     
     # Email
     MAIL_SERVER = os.getenv('MAIL_HOST', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
-    MAIL_USE_TLS = True
+    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_FROM_ADDRESS')
     
+    # Email outbox worker
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+    EMAIL_POLL_INTERVAL = float(os.getenv('EMAIL_POLL_INTERVAL', 2))
+    EMAIL_VISIBILITY_TIMEOUT = int(os.getenv('EMAIL_VISIBILITY_TIMEOUT', 120))  # seconds
+    EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RETRY_BACKOFF = int(os.getenv('EMAIL_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+    
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', './logs/app.log')
@@ -52,15 +136,30 @@ class Config:
     RATELIMIT_ENABLED = True
     RATELIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', 900000)) / 1000  # Convert to seconds
     RATELIMIT_MAX_REQUESTS = int(os.getenv('RATE_LIMIT_MAX_REQUESTS', 100))
+    # memory:// is per process; redis://... shares counters (one atomic call per check),
+    # batched+redis://...?flush_interval=1&flush_size=20 checks locally and flushes in batches
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    
+    # Loan purpose categories: label -> keywords matched case-insensitively against Loan.purpose
+    LOAN_PURPOSE_CATEGORIES = {
+        'School Fees': ['school fees'],
+        'Medical': ['medical'],
+        'Vacation': ['vacation'],
+        'Funeral': ['funeral'],
+        'Customary': ['customary'],
+    }
+    LOAN_PURPOSE_DEFAULT_CATEGORY = 'Other'
 
     @staticmethod
     def validate_config() -> None:
-        """Validate required environment variables."""
+        """Validate required environment variables.
+
+        Mail credentials are checked by the email worker, the only process that sends mail.
+        """
         required_vars = [
             'DATABASE_URL',
-            'SECRET_KEY',
-            'MAIL_USERNAME',
-            'MAIL_PASSWORD'
+            'SECRET_KEY'
         ]
         
         missing_vars = [var for var in required_vars if not os.getenv(var)]
@@ -89,6 +188,7 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    QUERY_BUDGET = 10
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,232 @@
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, func, case, union
+from bulk import bulk_insert
+from extensions import db
+from models import Loan, RepaymentRecord, ExpectedInstalment, LoanDelinquency, DelinquencyRun
+
+ACTIVE_STATUSES = ('approved',)
+
+
+def bucket_for(days_past_due, edges=None):
+    """Label the arrears bucket for a days-past-due value, e.g. 'current', '1-29', '90+'."""
+    edges = edges or current_app.config['DELINQUENCY_BUCKETS']
+    if days_past_due <= 0:
+        return 'current'
+    low = 1
+    for edge in edges:
+        if days_past_due < edge:
+            return f'{low}-{edge - 1}'
+        low = edge
+    return f'{edges[-1]}+'
+
+
+def _positions(loan_ids, as_of):
+    """Expected vs paid per loan as of `as_of`, with the due date of the oldest unpaid instalment.
+
+    A running SUM over each loan's schedule gives the cumulative amount due per
+    instalment; the first instalment whose cumulative amount exceeds what has been
+    paid is the oldest one still unpaid.
+    """
+    cutoff = datetime.combine(as_of + timedelta(days=1), datetime.min.time())
+
+    schedule = select(
+        ExpectedInstalment.loan_id,
+        ExpectedInstalment.due_date,
+        func.sum(ExpectedInstalment.payment).over(
+            partition_by=ExpectedInstalment.loan_id,
+            order_by=ExpectedInstalment.instalment_number
+        ).label('cumulative')
+    ).where(
+        ExpectedInstalment.loan_id.in_(loan_ids),
+        ExpectedInstalment.due_date <= as_of
+    ).subquery()
+
+    paid = select(
+        RepaymentRecord.loan_id,
+        func.sum(RepaymentRecord.amount).label('amount')
+    ).where(
+        RepaymentRecord.loan_id.in_(loan_ids),
+        RepaymentRecord.payment_date < cutoff
+    ).group_by(RepaymentRecord.loan_id).subquery()
+
+    paid_amount = func.coalesce(paid.c.amount, 0)
+    query = select(
+        schedule.c.loan_id,
+        func.max(schedule.c.cumulative),
+        paid_amount,
+        func.min(case((schedule.c.cumulative > paid_amount, schedule.c.due_date)))
+    ).outerjoin(paid, paid.c.loan_id == schedule.c.loan_id)\
+        .group_by(schedule.c.loan_id, paid.c.amount)
+
+    return db.session.execute(query).all()
+
+
+def _snapshot_rows(loan_ids, as_of, now):
+    """Build loan_delinquency rows for `loan_ids`; loans with nothing due yet are current."""
+    edges = current_app.config['DELINQUENCY_BUCKETS']
+    rows = {}
+    for loan_id, expected, paid, oldest_unpaid in _positions(loan_ids, as_of):
+        expected = Decimal(expected or 0)
+        paid = Decimal(paid or 0)
+        if isinstance(oldest_unpaid, str):
+            oldest_unpaid = date.fromisoformat(oldest_unpaid)
+        days = (as_of - oldest_unpaid).days if oldest_unpaid else 0
+        rows[loan_id] = {
+            'loan_id': loan_id,
+            'as_of': as_of,
+            'expected_amount': float(expected),
+            'paid_amount': float(paid),
+            'arrears_amount': float(max(Decimal(0), expected - paid)),
+            'oldest_unpaid_due_date': oldest_unpaid,
+            'days_past_due': days,
+            'bucket': bucket_for(days, edges),
+            'updated_at': now,
+        }
+
+    for loan_id in loan_ids:
+        rows.setdefault(loan_id, {
+            'loan_id': loan_id,
+            'as_of': as_of,
+            'expected_amount': 0.0,
+            'paid_amount': 0.0,
+            'arrears_amount': 0.0,
+            'oldest_unpaid_due_date': None,
+            'days_past_due': 0,
+            'bucket': 'current',
+            'updated_at': now,
+        })
+    return list(rows.values())
+
+
+def _write_batch(loan_ids, as_of):
+    rows = _snapshot_rows(loan_ids, as_of, datetime.utcnow())
+    db.session.execute(delete(LoanDelinquency).where(LoanDelinquency.loan_id.in_(loan_ids)))
+    bulk_insert(LoanDelinquency.__table__, rows)
+    db.session.commit()
+
+
+def _active_loan_ids():
+    return select(Loan.id).where(Loan.status.in_(ACTIVE_STATUSES))
+
+
+def _incremental_loan_ids(previous, as_of, last_repayment_id):
+    """Loans whose position can have changed since `previous`.
+
+    That is loans with repayments recorded after the checkpoint, loans with an
+    instalment falling due since the previous as_of date, and loans that were
+    already in arrears (their days past due keep growing).
+    """
+    active = Loan.status.in_(ACTIVE_STATUSES)
+    return union(
+        select(RepaymentRecord.loan_id)
+            .join(Loan, Loan.id == RepaymentRecord.loan_id)
+            .where(RepaymentRecord.id > previous.last_repayment_id,
+                   RepaymentRecord.id <= last_repayment_id, active),
+        select(ExpectedInstalment.loan_id)
+            .join(Loan, Loan.id == ExpectedInstalment.loan_id)
+            .where(ExpectedInstalment.due_date > previous.as_of,
+                   ExpectedInstalment.due_date <= as_of, active),
+        select(LoanDelinquency.loan_id)
+            .join(Loan, Loan.id == LoanDelinquency.loan_id)
+            .where(LoanDelinquency.days_past_due > 0, active),
+    )
+
+
+def _batches(previous, as_of, last_repayment_id, full, batch_size):
+    """Yield lists of loan ids to recompute."""
+    if full:
+        last_id = 0
+        while True:
+            batch = db.session.execute(
+                _active_loan_ids().where(Loan.id > last_id).order_by(Loan.id).limit(batch_size)
+            ).scalars().all()
+            if not batch:
+                return
+            last_id = batch[-1]
+            yield batch
+    else:
+        # Resolve the changed set once; rewriting snapshot rows must not move it
+        loan_ids = sorted(db.session.execute(_incremental_loan_ids(previous, as_of, last_repayment_id)).scalars())
+        for start in range(0, len(loan_ids), batch_size):
+            yield loan_ids[start:start + batch_size]
+
+
+def run_delinquency(as_of=None, full=False, batch_size=5000):
+    """Recompute loan_delinquency and record a checkpoint.
+
+    Args:
+        as_of: Date to age arrears against (default: today)
+        full: Recompute every active loan instead of only those changed since the last run
+        batch_size: Loans per statement/transaction
+
+    Returns:
+        The completed DelinquencyRun
+    """
+    as_of = as_of or datetime.utcnow().date()
+    previous = DelinquencyRun.query\
+        .filter_by(status='completed')\
+        .order_by(DelinquencyRun.id.desc())\
+        .first()
+    if previous is None or previous.as_of > as_of:
+        full = True
+
+    # Repayments inserted after this id are left for the next run
+    last_repayment_id = db.session.query(func.coalesce(func.max(RepaymentRecord.id), 0)).scalar()
+    run = DelinquencyRun(as_of=as_of, mode='full' if full else 'incremental', last_repayment_id=last_repayment_id)
+    db.session.add(run)
+    db.session.commit()
+
+    try:
+        # Loans no longer active drop out of the snapshot
+        db.session.execute(delete(LoanDelinquency).where(LoanDelinquency.loan_id.not_in(_active_loan_ids())))
+
+        for batch in _batches(previous, as_of, last_repayment_id, full, batch_size):
+            _write_batch(batch, as_of)
+            run.loans_processed += len(batch)
+
+        run.status = 'completed'
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        run.status = 'failed'
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+        raise
+    return run
+
+
+def bucket_summary():
+    """Loan count and arrears per bucket from the latest snapshot."""
+    rows = db.session.query(
+        LoanDelinquency.bucket,
+        func.count(LoanDelinquency.loan_id),
+        func.sum(LoanDelinquency.arrears_amount)
+    ).group_by(LoanDelinquency.bucket).all()
+    return {bucket: {'loans': count, 'arrears': float(arrears or 0)} for bucket, count, arrears in rows}
+
+
+@click.command('compute-delinquency')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Age arrears against this date.')
+@click.option('--full', is_flag=True, help='Recompute every active loan.')
+@click.option('--batch-size', default=5000, show_default=True, help='Loans per transaction.')
+@with_appcontext
+def compute_delinquency_command(as_of, full, batch_size):
+    """Compute days past due and arrears buckets for active loans."""
+    started = time.perf_counter()
+    run = run_delinquency(as_of=as_of.date() if as_of else None, full=full, batch_size=batch_size)
+    click.echo(f'{run.mode.title()} run as of {run.as_of}: {run.loans_processed} loans '
+               f'in {time.perf_counter() - started:.1f}s.')
+    for bucket, values in sorted(bucket_summary().items()):
+        click.echo(f"{bucket:>8}: {values['loans']} loans, {values['arrears']:.2f} in arrears")
+
+
+def init_delinquency(app):
+    """Register the delinquency batch command."""
+    app.cli.add_command(compute_delinquency_command)
@@ -0,0 +1,196 @@
+import os
+import signal
+import smtplib
+import socket
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_mail import Message, BadHeaderError
+from sqlalchemy import and_, or_, func
+from extensions import db, mail
+from models import EmailOutbox
+
+
+def claim_messages(worker_id, limit=50):
+    """Lock and mark up to `limit` deliverable outbox rows as sending for `worker_id`.
+
+    Mirrors the OCR queue: pending rows whose backoff has elapsed plus rows held by a
+    worker for longer than EMAIL_VISIBILITY_TIMEOUT, claimed with FOR UPDATE SKIP LOCKED.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['EMAIL_VISIBILITY_TIMEOUT'])
+
+    messages = EmailOutbox.query\
+        .filter(or_(
+            and_(EmailOutbox.status == 'pending', EmailOutbox.available_at <= now),
+            and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale)
+        ))\
+        .order_by(EmailOutbox.available_at, EmailOutbox.id)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)\
+        .all()
+
+    claimed = []
+    for message in messages:
+        if message.attempts >= message.max_attempts:
+            message.status = 'dead'
+            message.locked_at = None
+            message.last_error = message.last_error or 'Visibility timeout exceeded'
+            continue
+        message.status = 'sending'
+        message.locked_at = now
+        message.locked_by = worker_id
+        message.attempts += 1
+        claimed.append(message)
+
+    db.session.commit()
+    return claimed
+
+
+def _is_permanent(error):
+    """True for failures a retry cannot fix (rejected recipient, 5xx reply, malformed headers)."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, BadHeaderError)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def _record_failure(message, error):
+    message.last_error = f'{type(error).__name__}: {error}'
+    message.locked_at = None
+    if _is_permanent(error) or message.attempts >= message.max_attempts:
+        message.status = 'dead'
+    else:
+        backoff = current_app.config['EMAIL_RETRY_BACKOFF'] * 2 ** (message.attempts - 1)
+        message.status = 'pending'
+        message.available_at = datetime.utcnow() + timedelta(seconds=backoff)
+
+
+def deliver(connection, messages):
+    """Send claimed `messages` over an open SMTP `connection`, committing each outcome.
+
+    Raises:
+        smtplib.SMTPServerDisconnected: The connection dropped; unsent messages are retried later
+    """
+    for index, message in enumerate(messages):
+        try:
+            connection.send(Message(subject=message.subject, recipients=[message.recipient], body=message.body))
+        except smtplib.SMTPServerDisconnected as e:
+            for unsent in messages[index:]:
+                _record_failure(unsent, e)
+            db.session.commit()
+            raise
+        except Exception as e:
+            current_app.logger.warning(f"Email {message.id} to {message.recipient} failed: {str(e)}")
+            _record_failure(message, e)
+        else:
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            message.locked_at = None
+            message.last_error = None
+        db.session.commit()
+
+
+def outbox_stats():
+    """Return outbox counts per status and the age of the oldest pending message."""
+    rows = db.session.query(EmailOutbox.status, func.count(EmailOutbox.id), func.min(EmailOutbox.available_at))\
+        .group_by(EmailOutbox.status)\
+        .all()
+
+    stats = {'pending': 0, 'sending': 0, 'sent': 0, 'dead': 0, 'oldest_pending_seconds': 0}
+    for status, count, oldest in rows:
+        stats[status] = count
+        if status == 'pending' and oldest is not None:
+            stats['oldest_pending_seconds'] = max(0, (datetime.utcnow() - oldest).total_seconds())
+    return stats
+
+
+def requeue_dead_messages():
+    """Move dead-lettered messages back to pending with a fresh attempt budget. Returns the count."""
+    count = EmailOutbox.query.filter_by(status='dead').update({
+        EmailOutbox.status: 'pending',
+        EmailOutbox.attempts: 0,
+        EmailOutbox.available_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def run_sender(worker_id, poll_interval=2.0, batch_size=50):
+    """Drain the outbox until SIGTERM/SIGINT. Requires an app context.
+
+    One SMTP connection is opened when there is mail to send and reused for every
+    batch until the outbox runs dry; a dropped connection is reopened on the next poll.
+    """
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    current_app.logger.info(f"Email sender {worker_id} started")
+
+    while not _stopping:
+        messages = claim_messages(worker_id, limit=batch_size)
+        if not messages:
+            db.session.remove()
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            with mail.connect() as connection:
+                while messages:
+                    deliver(connection, messages)
+                    messages = [] if _stopping else claim_messages(worker_id, limit=batch_size)
+        except (smtplib.SMTPException, OSError) as e:
+            current_app.logger.error(f"SMTP connection failed: {str(e)}")
+            # Anything claimed but not attempted goes back through the normal backoff
+            for message in messages:
+                if message.status == 'sending':
+                    _record_failure(message, e)
+            db.session.commit()
+            time.sleep(poll_interval)
+
+    current_app.logger.info(f"Email sender {worker_id} stopped")
+
+
+@click.command('email-worker')
+@click.option('--batch-size', type=int, default=None, help='Messages claimed per batch (default: EMAIL_BATCH_SIZE).')
+@with_appcontext
+def email_worker_command(batch_size):
+    """Deliver queued email from the outbox."""
+    # Without credentials Flask-Mail skips AUTH, e.g. for a local relay or a development SMTP server
+    configured = [name for name in ('MAIL_USERNAME', 'MAIL_PASSWORD') if current_app.config.get(name)]
+    if len(configured) == 1:
+        missing = 'MAIL_PASSWORD' if configured == ['MAIL_USERNAME'] else 'MAIL_USERNAME'
+        raise click.UsageError(f"{configured[0]} is set but {missing} is not")
+    if not configured:
+        current_app.logger.info(f"No SMTP credentials configured; sending to {current_app.config['MAIL_SERVER']} without AUTH")
+    run_sender(
+        f"{socket.gethostname()}:{os.getpid()}",
+        poll_interval=current_app.config['EMAIL_POLL_INTERVAL'],
+        batch_size=batch_size or current_app.config['EMAIL_BATCH_SIZE']
+    )
+
+
+@click.command('email-outbox')
+@click.option('--requeue-dead', is_flag=True, help='Retry dead-lettered messages.')
+@with_appcontext
+def email_outbox_command(requeue_dead):
+    """Print outbox counts, optionally requeueing dead letters."""
+    if requeue_dead:
+        click.echo(f'Requeued {requeue_dead_messages()} messages.')
+    for key, value in outbox_stats().items():
+        click.echo(f'{key}: {value}')
+
+
+def init_email_outbox(app):
+    """Register the email worker and outbox commands."""
+    app.cli.add_command(email_worker_command)
+    app.cli.add_command(email_outbox_command)
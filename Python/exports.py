@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+from extensions import db
+from models import Borrower, Loan, RepaymentRecord
+
+# dataset -> (model, exported columns, date filter column)
+DATASETS = {
+    'loans': (Loan, (
+        'id', 'borrower_id', 'amount', 'term', 'interest_rate', 'repayment_frequency', 'status',
+        'purpose', 'purpose_category', 'created_at', 'approved_at', 'approved_by',
+    ), 'created_at'),
+    'borrowers': (Borrower, (
+        'id', 'user_id', 'full_name', 'email', 'phone', 'employer_name', 'employment_status',
+        'monthly_income', 'status', 'created_at',
+    ), 'created_at'),
+    'repayments': (RepaymentRecord, (
+        'id', 'loan_id', 'amount', 'payment_date', 'due_date', 'is_late_payment', 'created_at',
+    ), 'payment_date'),
+}
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date, e.g. 2024-01-31")
+
+
+def export_query(dataset, status=None, date_from=None, date_to=None):
+    """Build the id-ordered SELECT for an export.
+
+    `status` filters loans and borrowers on their status and repayments on
+    'late'/'ontime'. `date_from` and `date_to` bound the dataset's date column,
+    `date_to` being exclusive.
+
+    Raises:
+        ValueError: For an unknown dataset or bad filter values
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of: {', '.join(DATASETS)}")
+    model, columns, date_column = DATASETS[dataset]
+
+    query = select(*[getattr(model, name) for name in columns]).order_by(model.id)
+    if status:
+        if model is RepaymentRecord:
+            if status not in ('late', 'ontime'):
+                raise ValueError("status must be 'late' or 'ontime' for repayments")
+            query = query.where(RepaymentRecord.is_late_payment.is_(status == 'late'))
+        else:
+            query = query.where(model.status == status)
+
+    start = _parse_date(date_from, 'from')
+    end = _parse_date(date_to, 'to')
+    if start:
+        query = query.where(getattr(model, date_column) >= start)
+    if end:
+        query = query.where(getattr(model, date_column) < end)
+    return query, columns
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(rows, columns, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for batch in rows.partitions(batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, columns, batch_size):
+    for batch in rows.partitions(batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(columns, map(_json_value, row))), separators=(',', ':')) + '\n'
+            for row in batch
+        )
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt='csv', status=None, date_from=None, date_to=None, compress=False):
+    """Stream an export as a generator response, one `yield_per` batch in memory at a time.
+
+    Returns:
+        Flask Response whose body is produced while the server-side cursor is read
+
+    Raises:
+        ValueError: For an unknown dataset/format or bad filter values
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    query, columns = export_query(dataset, status, date_from, date_to)
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    mimetype, extension = FORMATS[fmt]
+
+    def generate():
+        # yield_per streams from a server-side cursor instead of buffering the result
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        try:
+            producer = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+            chunks = producer(rows, columns, batch_size)
+            if compress:
+                yield from _gzipped(chunks)
+            else:
+                for chunk in chunks:
+                    yield chunk.encode('utf-8')
+        finally:
+            rows.close()
+
+    filename = f"{dataset}_{datetime.utcnow():%Y%m%d%H%M%S}.{extension}"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
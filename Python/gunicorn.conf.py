@@ -0,0 +1,82 @@
+"""Gunicorn settings for production; picked up automatically when started from this directory.
+
+    flask --app app init-db      # once per deploy: migrations and admin user
+    gunicorn wsgi:app
+
+The app is imported once in the master (preload_app) and forked into workers.
+`kill -HUP <master>` restarts workers gracefully with the preloaded code; to deploy
+new code without dropping requests, send USR2 (starts a new master) then QUIT the old one.
+"""
+import multiprocessing
+import os
+import shutil
+
+cpus = multiprocessing.cpu_count()
+
+wsgi_app = 'wsgi:app'
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+workers = int(os.getenv('WEB_CONCURRENCY', cpus * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+# config.py divides DB_MAX_CONNECTIONS/DB_MAX_OVERFLOW by this, so every worker's pool
+# together stays under Postgres max_connections. Set before the app is preloaded.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+
+# Samples of workers from a previous run would otherwise be aggregated forever. Cleared
+# here rather than in on_starting, which runs after the app (and its metrics) is preloaded;
+# the marker keeps a HUP (which re-reads this file) from wiping live workers' files.
+multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if multiproc_dir and not os.environ.get('GUNICORN_METRICS_DIR_CLEARED'):
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+    os.environ['GUNICORN_METRICS_DIR_CLEARED'] = '1'
+
+
+def on_starting(server):
+    pool_size = max(1, int(os.getenv('DB_MAX_CONNECTIONS', 20)) // workers)
+    if pool_size < threads:
+        server.log.warning(
+            f"DB pool of {pool_size} per worker is smaller than {threads} threads; "
+            f"raise DB_MAX_CONNECTIONS or lower GUNICORN_THREADS/WEB_CONCURRENCY"
+        )
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared across processes
+    from extensions import db
+    from metrics import record_pool_limits
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    record_pool_limits(app)
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker: hits buffered by a batched+ rate limit storage would be lost
+    from ratelimit import flush_rate_limits
+    try:
+        flush_rate_limits()
+    except Exception as e:
+        server.log.warning(f"Could not flush rate limit counters: {str(e)}")
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,148 @@
+import os
+import time
+
+from flask import Response, current_app, g, request
+from flask_login import current_user
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from extensions import db
+from ratelimit import limiter
+
+# With PROMETHEUS_MULTIPROC_DIR set (before this module is imported) every gunicorn
+# worker writes its samples to mmap'd files there and /metrics aggregates them.
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by endpoint',
+    ['endpoint', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requests currently being handled',
+    multiprocess_mode='livesum'
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    multiprocess_mode='livesum'
+)
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Connections open beyond pool_size',
+    multiprocess_mode='livesum'
+)
+DB_POOL_LIMIT = Gauge(
+    'db_pool_limit_connections',
+    'Configured pool_size and max_overflow per process',
+    ['setting'],
+    multiprocess_mode='livemax'
+)
+UPLOAD_BYTES = Counter(
+    'upload_bytes_total',
+    'Bytes received in multipart uploads and resumable upload chunks',
+    ['endpoint']
+)
+RATE_LIMITED = Counter(
+    'rate_limit_rejections_total',
+    'Requests rejected with 429 by the rate limiter',
+    ['endpoint']
+)
+# Set from the database on each scrape, so every worker reports the same shared queue
+OCR_QUEUE_DEPTH = Gauge(
+    'ocr_queue_depth',
+    'OCR jobs pending or running',
+    multiprocess_mode='livemostrecent'
+)
+OCR_QUEUE_OLDEST_PENDING = Gauge(
+    'ocr_queue_oldest_pending_seconds',
+    'Age of the oldest pending OCR job',
+    multiprocess_mode='livemostrecent'
+)
+
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_in_flight = True
+    IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+
+    endpoint = _endpoint()
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    if request.mimetype in ('multipart/form-data', 'application/octet-stream') and request.content_length:
+        UPLOAD_BYTES.labels(endpoint).inc(request.content_length)
+    if response.status_code == 429:
+        RATE_LIMITED.labels(endpoint).inc()
+
+    pool = db.engine.pool
+    if hasattr(pool, 'checkedout'):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+    return response
+
+
+def _teardown_request(exc):
+    # Runs even when a view raised, so the gauge never drifts upwards
+    if g.pop('metrics_in_flight', False):
+        IN_FLIGHT.dec()
+
+
+def _authorized():
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key == os.getenv('API_KEY'):
+        return True
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+
+def _record_ocr_queue():
+    from ocr_queue import queue_stats
+    try:
+        stats = queue_stats()
+    except Exception as e:
+        # Request and pool metrics are still worth serving while the database is unreachable
+        db.session.rollback()
+        current_app.logger.warning(f"Could not read OCR queue stats: {str(e)}")
+        return
+    OCR_QUEUE_DEPTH.set(stats['depth'])
+    OCR_QUEUE_OLDEST_PENDING.set(stats['oldest_pending_seconds'])
+
+
+def metrics_view():
+    """Prometheus text exposition of this process, or of all workers in multiprocess mode."""
+    if not _authorized():
+        return Response('Invalid or missing API key\n', status=401, mimetype='text/plain')
+    _record_ocr_queue()
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def record_pool_limits(app):
+    """Publish this process's pool settings (again after a fork, as multiprocess values are per pid)."""
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    DB_POOL_LIMIT.labels('pool_size').set(options.get('pool_size', 5))
+    DB_POOL_LIMIT.labels('max_overflow').set(options.get('max_overflow', 10))
+
+
+def init_metrics(app):
+    """Record request metrics and expose them on /metrics."""
+    record_pool_limits(app)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    # Scrapes are never rate limited, so they neither fail nor use up the API key's budget
+    app.add_url_rule('/metrics', 'metrics', limiter.exempt(metrics_view))
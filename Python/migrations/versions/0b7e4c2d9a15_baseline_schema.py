@@ -0,0 +1,121 @@
+"""Baseline schema: users, borrowers, loans, repayment records and documents
+
+Revision ID: 0b7e4c2d9a15
+Revises: 
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e4c2d9a15'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() before migrations existed already have
+    # these tables, so each one is only created when missing
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('username', sa.String(length=80), nullable=False, unique=True),
+            sa.Column('email', sa.String(length=120), nullable=False, unique=True),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+
+    if not inspector.has_table('borrowers'):
+        op.create_table(
+            'borrowers',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False, unique=True),
+            sa.Column('full_name', sa.String(length=200), nullable=False),
+            sa.Column('date_of_birth', sa.Date(), nullable=True),
+            sa.Column('gender', sa.String(length=10), nullable=True),
+            sa.Column('marital_status', sa.String(length=20), nullable=True),
+            sa.Column('dependents', sa.Integer(), nullable=True),
+            sa.Column('nationality', sa.String(length=100), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.Column('address', sa.String(length=300), nullable=True),
+            sa.Column('city', sa.String(length=100), nullable=True),
+            sa.Column('state', sa.String(length=100), nullable=True),
+            sa.Column('postal_code', sa.String(length=20), nullable=True),
+            sa.Column('employment_type', sa.String(length=50), nullable=True),
+            sa.Column('employer_name', sa.String(length=200), nullable=True),
+            sa.Column('employer_address', sa.String(length=300), nullable=True),
+            sa.Column('employment_duration', sa.Integer(), nullable=True),
+            sa.Column('position', sa.String(length=100), nullable=True),
+            sa.Column('department', sa.String(length=100), nullable=True),
+            sa.Column('employment_status', sa.String(length=50), nullable=True),
+            sa.Column('annual_income', sa.Numeric(12, 2), nullable=True),
+            sa.Column('monthly_income', sa.Numeric(10, 2), nullable=True),
+            sa.Column('other_income', sa.Numeric(10, 2), nullable=True),
+            sa.Column('total_expenses', sa.Numeric(10, 2), nullable=True),
+            sa.Column('bank_name', sa.String(length=100), nullable=True),
+            sa.Column('account_number', sa.String(length=50), nullable=True),
+            sa.Column('bsb_code', sa.String(length=10), nullable=True),
+            sa.Column('account_type', sa.String(length=20), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table('loans'):
+        op.create_table(
+            'loans',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('borrower_id', sa.Integer(), sa.ForeignKey('borrowers.id'), nullable=False),
+            sa.Column('amount', sa.Numeric(12, 2), nullable=False),
+            sa.Column('term', sa.Integer(), nullable=True),
+            sa.Column('interest_rate', sa.Numeric(5, 2), nullable=True),
+            sa.Column('approved_by', sa.Integer(), sa.ForeignKey('user.id'), nullable=True),
+            sa.Column('approved_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.Text(), nullable=True),
+            sa.Column('purpose', sa.Text(), nullable=True),
+        )
+
+    if not inspector.has_table('repayment_records'):
+        op.create_table(
+            'repayment_records',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('loan_id', sa.Integer(), sa.ForeignKey('loans.id'), nullable=False),
+            sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('payment_date', sa.DateTime(), nullable=False),
+            sa.Column('due_date', sa.DateTime(), nullable=False),
+            sa.Column('is_late_payment', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table('documents'):
+        op.create_table(
+            'documents',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+            sa.Column('document_type', sa.String(length=50), nullable=False),
+            sa.Column('file_name', sa.String(length=255), nullable=False),
+            sa.Column('file_path', sa.String(length=500), nullable=False),
+            sa.Column('file_url', sa.String(length=500), nullable=True),
+            sa.Column('ocr_status', sa.String(length=20), nullable=True),
+            sa.Column('ocr_confidence_score', sa.Float(), nullable=True),
+            sa.Column('extracted_data', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table('documents')
+    op.drop_table('repayment_records')
+    op.drop_table('loans')
+    op.drop_table('borrowers')
+    op.drop_table('user')
@@ -0,0 +1,70 @@
+"""Add the portfolio_summary counters table
+
+Revision ID: 2d5f8a1c6e37
+Revises: 0b7e4c2d9a15
+Create Date: 2026-10-17 20:02:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d5f8a1c6e37'
+down_revision = '0b7e4c2d9a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('portfolio_summary'):
+        return
+
+    summary = op.create_table(
+        'portfolio_summary',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('total_loans', sa.Integer(), nullable=False),
+        sa.Column('active_loans', sa.Integer(), nullable=False),
+        sa.Column('pending_applications', sa.Integer(), nullable=False),
+        sa.Column('total_disbursed', sa.Numeric(14, 2), nullable=False),
+        sa.Column('total_repayments', sa.Integer(), nullable=False),
+        sa.Column('ontime_repayments', sa.Integer(), nullable=False),
+        sa.Column('late_repayments', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+    # The flush hook only applies increments to an existing row, so build it from
+    # the current data here (the same figures `flask reconcile-portfolio` computes)
+    loans = sa.table('loans', sa.column('status'), sa.column('amount'))
+    repayments = sa.table('repayment_records', sa.column('is_late_payment'))
+    approved = loans.c.status == 'approved'
+    loan_counts = bind.execute(sa.select(
+        sa.func.count(),
+        sa.func.sum(sa.case((approved, 1), else_=0)),
+        sa.func.sum(sa.case((loans.c.status == 'pending', 1), else_=0)),
+        sa.func.sum(sa.case((approved, loans.c.amount), else_=0)),
+    )).one()
+    repayment_counts = bind.execute(sa.select(
+        sa.func.count(),
+        sa.func.sum(sa.case((repayments.c.is_late_payment.is_(False), 1), else_=0)),
+        sa.func.sum(sa.case((repayments.c.is_late_payment.is_(True), 1), else_=0)),
+    )).one()
+
+    op.bulk_insert(summary, [{
+        'id': 1,
+        'total_loans': loan_counts[0] or 0,
+        'active_loans': loan_counts[1] or 0,
+        'pending_applications': loan_counts[2] or 0,
+        'total_disbursed': loan_counts[3] or 0,
+        'total_repayments': repayment_counts[0] or 0,
+        'ontime_repayments': repayment_counts[1] or 0,
+        'late_repayments': repayment_counts[2] or 0,
+        'updated_at': datetime.utcnow(),
+    }])
+
+
+def downgrade():
+    op.drop_table('portfolio_summary')
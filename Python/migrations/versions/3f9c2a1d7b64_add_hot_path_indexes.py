@@ -0,0 +1,60 @@
+"""Add indexes for the dashboard, admin listing, API and export queries
+
+Revision ID: 3f9c2a1d7b64
+Revises: 9c1f4b8e3a26
+Create Date: 2026-10-17 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a1d7b64'
+down_revision = '9c1f4b8e3a26'
+branch_labels = None
+depends_on = None
+
+# Existing databases were built with db.create_all(), which may already have created
+# these from the model definitions, hence if_not_exists.
+INDEXES = [
+    ('ix_loans_status_created_at', 'loans', ['status', 'created_at'], None),
+    ('ix_loans_created_at_id', 'loans', ['created_at', 'id'], None),
+    ('ix_loans_borrower_id', 'loans', ['borrower_id'], None),
+    ('ix_repayment_records_loan_id_payment_date', 'repayment_records', ['loan_id', 'payment_date'], None),
+    ('ix_repayment_records_payment_date', 'repayment_records', ['payment_date'], None),
+    ('ix_repayment_records_late_loan_id', 'repayment_records', ['loan_id'],
+     {'postgresql': 'is_late_payment IS true', 'sqlite': 'is_late_payment IS 1'}),
+    ('ix_documents_user_id_uploaded_at', 'documents', ['user_id', 'uploaded_at'], None),
+    ('ix_documents_loan_id', 'documents', ['loan_id'], None),
+    ('ix_documents_pending', 'documents', ['created_at'],
+     {'postgresql': "ocr_status = 'pending'", 'sqlite': "ocr_status = 'pending'"}),
+]
+
+
+def _index_kwargs(dialect, where):
+    kwargs = {}
+    if where:
+        kwargs[f'{dialect}_where'] = sa.text(where[dialect])
+    if dialect == 'postgresql':
+        # Build without blocking writes to the live tables
+        kwargs['postgresql_concurrently'] = True
+    return kwargs
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if where and dialect not in where:
+                continue
+            op.create_index(name, table, columns, if_not_exists=True, **_index_kwargs(dialect, where))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            kwargs = {'postgresql_concurrently': True} if dialect == 'postgresql' else {}
+            op.drop_index(name, table_name=table, if_exists=True, **kwargs)
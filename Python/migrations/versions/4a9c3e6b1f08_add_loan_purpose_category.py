@@ -0,0 +1,35 @@
+"""Add loans.purpose_category and its index
+
+Revision ID: 4a9c3e6b1f08
+Revises: 2d5f8a1c6e37
+Create Date: 2026-10-17 20:04:00.000000
+
+Existing loans are left uncategorised; run `flask backfill-purpose-categories`
+afterwards to classify them with the configured LOAN_PURPOSE_CATEGORIES.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a9c3e6b1f08'
+down_revision = '2d5f8a1c6e37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'purpose_category' not in {column['name'] for column in inspector.get_columns('loans')}:
+        with op.batch_alter_table('loans') as batch_op:
+            batch_op.add_column(sa.Column('purpose_category', sa.String(length=50), nullable=True))
+
+    if 'ix_loans_purpose_category' not in {index['name'] for index in inspector.get_indexes('loans')}:
+        op.create_index('ix_loans_purpose_category', 'loans', ['purpose_category'])
+
+
+def downgrade():
+    op.drop_index('ix_loans_purpose_category', table_name='loans')
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_column('purpose_category')
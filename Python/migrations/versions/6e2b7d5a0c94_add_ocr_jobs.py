@@ -0,0 +1,55 @@
+"""Add the ocr_jobs queue table, documents.loan_id and allow anonymous documents
+
+Revision ID: 6e2b7d5a0c94
+Revises: 4a9c3e6b1f08
+Create Date: 2026-10-17 20:06:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2b7d5a0c94'
+down_revision = '4a9c3e6b1f08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name']: column for column in inspector.get_columns('documents')}
+
+    # Applications are uploaded before an account exists, and the worker links the loan it creates
+    with op.batch_alter_table('documents') as batch_op:
+        if 'loan_id' not in columns:
+            batch_op.add_column(sa.Column('loan_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_documents_loan_id_loans', 'loans', ['loan_id'], ['id'])
+        if not columns['user_id']['nullable']:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+
+    if not inspector.has_table('ocr_jobs'):
+        op.create_table(
+            'ocr_jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('document_id', sa.Integer(), sa.ForeignKey('documents.id'), nullable=False, unique=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('max_attempts', sa.Integer(), nullable=False),
+            sa.Column('available_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_at', sa.DateTime(), nullable=True),
+            sa.Column('locked_by', sa.String(length=100), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_ocr_jobs_claim', 'ocr_jobs', ['status', 'available_at'])
+
+
+def downgrade():
+    op.drop_index('ix_ocr_jobs_claim', table_name='ocr_jobs')
+    op.drop_table('ocr_jobs')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_constraint('fk_documents_loan_id_loans', type_='foreignkey')
+        batch_op.drop_column('loan_id')
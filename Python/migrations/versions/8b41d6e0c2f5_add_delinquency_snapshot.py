@@ -0,0 +1,54 @@
+"""Add the loan_delinquency snapshot and delinquency_runs checkpoint tables
+
+Revision ID: 8b41d6e0c2f5
+Revises: 3f9c2a1d7b64
+Create Date: 2026-10-17 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e0c2f5'
+down_revision = '3f9c2a1d7b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('loan_delinquency'):
+        op.create_table(
+            'loan_delinquency',
+            sa.Column('loan_id', sa.Integer(), sa.ForeignKey('loans.id'), primary_key=True),
+            sa.Column('as_of', sa.Date(), nullable=False),
+            sa.Column('expected_amount', sa.Numeric(12, 2), nullable=False),
+            sa.Column('paid_amount', sa.Numeric(12, 2), nullable=False),
+            sa.Column('arrears_amount', sa.Numeric(12, 2), nullable=False),
+            sa.Column('oldest_unpaid_due_date', sa.Date(), nullable=True),
+            sa.Column('days_past_due', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.String(length=10), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_loan_delinquency_bucket', 'loan_delinquency', ['bucket'])
+
+    if not inspector.has_table('delinquency_runs'):
+        op.create_table(
+            'delinquency_runs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('as_of', sa.Date(), nullable=False),
+            sa.Column('mode', sa.String(length=20), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('last_repayment_id', sa.Integer(), nullable=False),
+            sa.Column('loans_processed', sa.Integer(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table('delinquency_runs')
+    op.drop_index('ix_loan_delinquency_bucket', table_name='loan_delinquency')
+    op.drop_table('loan_delinquency')
@@ -0,0 +1,50 @@
+"""Add loans.repayment_frequency and the expected_instalments schedule table
+
+Revision ID: 9c1f4b8e3a26
+Revises: 6e2b7d5a0c94
+Create Date: 2026-10-17 20:08:00.000000
+
+Schedules for existing loans are built afterwards by `flask generate-schedules`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1f4b8e3a26'
+down_revision = '6e2b7d5a0c94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'repayment_frequency' not in {column['name'] for column in inspector.get_columns('loans')}:
+        with op.batch_alter_table('loans') as batch_op:
+            batch_op.add_column(sa.Column('repayment_frequency', sa.String(length=20), nullable=True))
+        # Same as the model default for new loans
+        loans = sa.table('loans', sa.column('repayment_frequency'))
+        op.execute(loans.update().where(loans.c.repayment_frequency.is_(None)).values(repayment_frequency='fortnightly'))
+
+    if not inspector.has_table('expected_instalments'):
+        op.create_table(
+            'expected_instalments',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('loan_id', sa.Integer(), sa.ForeignKey('loans.id'), nullable=False),
+            sa.Column('instalment_number', sa.Integer(), nullable=False),
+            sa.Column('due_date', sa.Date(), nullable=False),
+            sa.Column('payment', sa.Numeric(12, 2), nullable=False),
+            sa.Column('principal', sa.Numeric(12, 2), nullable=False),
+            sa.Column('interest', sa.Numeric(12, 2), nullable=False),
+            sa.Column('balance', sa.Numeric(12, 2), nullable=False),
+            sa.UniqueConstraint('loan_id', 'instalment_number', name='uq_expected_instalments_loan_number'),
+        )
+        op.create_index('ix_expected_instalments_due_date', 'expected_instalments', ['due_date'])
+
+
+def downgrade():
+    op.drop_index('ix_expected_instalments_due_date', table_name='expected_instalments')
+    op.drop_table('expected_instalments')
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_column('repayment_frequency')
@@ -0,0 +1,44 @@
+"""Add the upload_sessions table for resumable uploads
+
+Revision ID: a3d8f6b2c915
+Revises: e5b7d3c19a42
+Create Date: 2026-10-17 23:55:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8f6b2c915'
+down_revision = 'e5b7d3c19a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('upload_sessions'):
+        return
+
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=True),
+        sa.Column('document_type', sa.String(length=50), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('total_size', sa.Integer(), nullable=False),
+        sa.Column('received', sa.Integer(), nullable=False),
+        sa.Column('temp_path', sa.String(length=500), nullable=False),
+        sa.Column('expected_hash', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('document_id', sa.Integer(), sa.ForeignKey('documents.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_upload_sessions_status_updated_at', 'upload_sessions', ['status', 'updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_upload_sessions_status_updated_at', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
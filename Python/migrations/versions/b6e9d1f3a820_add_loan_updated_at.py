@@ -0,0 +1,34 @@
+"""Add loans.updated_at
+
+Revision ID: b6e9d1f3a820
+Revises: f1a6c8d2b473
+Create Date: 2026-10-18 09:30:00.000000
+
+The vintage cache fingerprint includes max(updated_at), so edits to a loan's
+amount, term or purpose category invalidate the cached curves.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e9d1f3a820'
+down_revision = 'f1a6c8d2b473'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'updated_at' not in {column['name'] for column in inspector.get_columns('loans')}:
+        with op.batch_alter_table('loans') as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing loans count as last written when created; later writes set the current time
+        loans = sa.table('loans', sa.column('updated_at'), sa.column('created_at'))
+        op.execute(loans.update().values(updated_at=loans.c.created_at))
+
+
+def downgrade():
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_column('updated_at')
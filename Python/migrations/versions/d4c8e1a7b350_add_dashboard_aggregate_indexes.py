@@ -0,0 +1,35 @@
+"""Add covering indexes for the dashboard document and repayment aggregates
+
+Revision ID: d4c8e1a7b350
+Revises: a3d8f6b2c915
+Create Date: 2026-10-18 00:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4c8e1a7b350'
+down_revision = 'a3d8f6b2c915'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_repayment_records_is_late_payment', 'repayment_records', ['is_late_payment']),
+    ('ix_documents_ocr_stats', 'documents', ['ocr_status', 'ocr_confidence_score', 'created_at', 'uploaded_at']),
+]
+
+
+def upgrade():
+    # Built without blocking writes on Postgres, as in 3f9c2a1d7b64
+    kwargs = {'postgresql_concurrently': True} if op.get_bind().dialect.name == 'postgresql' else {}
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def downgrade():
+    kwargs = {'postgresql_concurrently': True} if op.get_bind().dialect.name == 'postgresql' else {}
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, **kwargs)
@@ -0,0 +1,37 @@
+"""Add content_hash and file_size to documents for the content-addressed upload store
+
+Revision ID: e5b7d3c19a42
+Revises: c7e2a94f1b38
+Create Date: 2026-10-17 23:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7d3c19a42'
+down_revision = 'c7e2a94f1b38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('documents')}
+
+    with op.batch_alter_table('documents') as batch_op:
+        if 'content_hash' not in columns:
+            batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        if 'file_size' not in columns:
+            batch_op.add_column(sa.Column('file_size', sa.Integer(), nullable=True))
+
+    if 'ix_documents_content_hash' not in {index['name'] for index in inspector.get_indexes('documents')}:
+        op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('file_size')
+        batch_op.drop_column('content_hash')
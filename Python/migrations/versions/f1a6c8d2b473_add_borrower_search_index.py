@@ -0,0 +1,43 @@
+"""Add the borrower search index (pg_trgm GIN index, or an FTS5 table on SQLite)
+
+Revision ID: f1a6c8d2b473
+Revises: d4c8e1a7b350
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+
+# The search query must use exactly the indexed expression, so both come from search.py
+from search import PG_STATEMENTS, SQLITE_STATEMENTS
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c8d2b473'
+down_revision = 'd4c8e1a7b350'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction; the build indexes existing rows
+        with op.get_context().autocommit_block():
+            for statement in PG_STATEMENTS:
+                op.execute(statement.format(concurrently='CONCURRENTLY'))
+    elif dialect == 'sqlite':
+        for statement in SQLITE_STATEMENTS:
+            op.execute(statement)
+        # The triggers only cover later writes; index the borrowers that already exist
+        op.execute("INSERT INTO borrowers_fts(borrowers_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_borrowers_search_trgm')
+    elif dialect == 'sqlite':
+        for trigger in ('borrowers_fts_ai', 'borrowers_fts_ad', 'borrowers_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS borrowers_fts')
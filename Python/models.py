@@ -88,21 +88,32 @@ class Borrower(db.Model):
 class Loan(db.Model):
     """Model for storing loan information"""
     __tablename__ = 'loans'
+    __table_args__ = (
+        db.Index('ix_loans_status_created_at', 'status', 'created_at'),
+        db.Index('ix_loans_created_at_id', 'created_at', 'id'),
+        db.Index('ix_loans_borrower_id', 'borrower_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     borrower_id = db.Column(db.Integer, db.ForeignKey('borrowers.id'), nullable=False)
-    amount = db.Column(db.Numeric(12, 2), nullable=False)
-    term = db.Column(db.Integer)
-    interest_rate = db.Column(db.Numeric(5, 2))
+    # active_history: portfolio.py needs the committed value even when the attribute has expired
+    amount = db.column_property(db.Column(db.Numeric(12, 2), nullable=False), active_history=True)
+    term = db.Column(db.Integer)  # number of repayment periods
+    interest_rate = db.Column(db.Numeric(5, 2))  # annual percentage rate
+    repayment_frequency = db.Column(db.String(20), default='fortnightly')  # weekly, fortnightly, monthly
     approved_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     approved_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.Text, default='pending')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    status = db.column_property(db.Column(db.Text, default='pending'), active_history=True)
     purpose = db.Column(db.Text)
+    purpose_category = db.Column(db.String(50), index=True)
     
     # Relationships
     approver = db.relationship('User', foreign_keys=[approved_by])
     repayments = db.relationship('RepaymentRecord', backref='loan', lazy=True)
+    instalments = db.relationship('ExpectedInstalment', backref='loan', lazy=True,
+                                  order_by='ExpectedInstalment.instalment_number')
     
     def to_dict(self):
         """Convert loan object to dictionary for API responses"""
@@ -114,6 +125,7 @@ class Loan(db.Model):
             'interest_rate': str(self.interest_rate),
             'status': self.status,
             'purpose': self.purpose,
+            'purpose_category': self.purpose_category,
             'created_at': self.created_at.isoformat(),
             'approved_at': self.approved_at.isoformat() if self.approved_at else None
         }
@@ -121,27 +133,242 @@ class Loan(db.Model):
 class RepaymentRecord(db.Model):
     """Model for tracking loan repayments"""
     __tablename__ = 'repayment_records'
+    __table_args__ = (
+        db.Index('ix_repayment_records_loan_id_payment_date', 'loan_id', 'payment_date'),
+        db.Index('ix_repayment_records_payment_date', 'payment_date'),
+        db.Index('ix_repayment_records_late_loan_id', 'loan_id',
+                 postgresql_where=db.text('is_late_payment IS true'),
+                 sqlite_where=db.text('is_late_payment IS 1')),
+        # Covers the whole-table repayment rate aggregate (index-only scan)
+        db.Index('ix_repayment_records_is_late_payment', 'is_late_payment'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'), nullable=False)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     payment_date = db.Column(db.DateTime, nullable=False)
     due_date = db.Column(db.DateTime, nullable=False)
-    is_late_payment = db.Column(db.Boolean, default=False)
+    # active_history: portfolio.py needs the committed value even when the attribute has expired
+    is_late_payment = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class ExpectedInstalment(db.Model):
+    """Model for the expected repayment schedule of a loan"""
+    __tablename__ = 'expected_instalments'
+    __table_args__ = (
+        db.UniqueConstraint('loan_id', 'instalment_number', name='uq_expected_instalments_loan_number'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'), nullable=False)
+    instalment_number = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.Date, nullable=False, index=True)
+    payment = db.Column(db.Numeric(12, 2), nullable=False)
+    principal = db.Column(db.Numeric(12, 2), nullable=False)
+    interest = db.Column(db.Numeric(12, 2), nullable=False)
+    balance = db.Column(db.Numeric(12, 2), nullable=False)  # outstanding after this instalment
+    
+    def to_dict(self):
+        """Convert instalment object to dictionary for API responses"""
+        return {
+            'instalment_number': self.instalment_number,
+            'due_date': self.due_date.isoformat(),
+            'payment': str(self.payment),
+            'principal': str(self.principal),
+            'interest': str(self.interest),
+            'balance': str(self.balance)
+        }
+
 class Document(db.Model):
     """Model for storing document information"""
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_user_id_uploaded_at', 'user_id', 'uploaded_at'),
+        db.Index('ix_documents_loan_id', 'loan_id'),
+        db.Index('ix_documents_content_hash', 'content_hash'),
+        db.Index('ix_documents_pending', 'created_at',
+                 postgresql_where=db.text("ocr_status = 'pending'"),
+                 sqlite_where=db.text("ocr_status = 'pending'")),
+        # Covers the dashboard document stats and processing-time histogram (index-only scan)
+        db.Index('ix_documents_ocr_stats', 'ocr_status', 'ocr_confidence_score', 'created_at', 'uploaded_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # Set once an anonymous application has an account
+    loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'))
     document_type = db.Column(db.String(50), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_url = db.Column(db.String(500))
+    content_hash = db.Column(db.String(64))  # SHA-256 of the stored blob
+    file_size = db.Column(db.Integer)
     ocr_status = db.Column(db.String(20), default='pending')
     ocr_confidence_score = db.Column(db.Float)
     extracted_data = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_at = db.Column(db.DateTime)
+
+class OcrJob(db.Model):
+    """Durable queue entry for OCR processing of an uploaded document"""
+    __tablename__ = 'ocr_jobs'
+    __table_args__ = (
+        db.Index('ix_ocr_jobs_claim', 'status', 'available_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False, unique=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    document = db.relationship('Document', backref=db.backref('ocr_job', uselist=False))
+    
+    def to_dict(self):
+        """Convert job object to dictionary for status polling"""
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'ocr_status': self.document.ocr_status if self.document else None,
+            'loan_id': self.document.loan_id if self.document else None,
+            'error': self.last_error if self.status == 'failed' else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class EmailOutbox(db.Model):
+    """Outgoing email written in the same transaction as the change it announces; sent by the email worker"""
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_claim', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert outbox entry to dictionary"""
+        return {
+            'id': self.id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+class UploadSession(db.Model):
+    """Resumable upload in progress: chunks are appended to temp_path until `received` reaches `total_size`"""
+    __tablename__ = 'upload_sessions'
+    __table_args__ = (
+        db.Index('ix_upload_sessions_status_updated_at', 'status', 'updated_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, handed to the client
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    document_type = db.Column(db.String(50), nullable=False)
+    file_name = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.Integer, nullable=False, default=0)
+    temp_path = db.Column(db.String(500), nullable=False)
+    expected_hash = db.Column(db.String(64))  # optional client-supplied SHA-256, checked on finalize
+    status = db.Column(db.String(20), nullable=False, default='receiving')  # receiving, completed
+    locked_at = db.Column(db.DateTime)  # set while a chunk is being written
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    document = db.relationship('Document')
+
+    def to_dict(self):
+        """Convert upload session to dictionary for resuming"""
+        return {
+            'upload_id': self.id,
+            'file_name': self.file_name,
+            'document_type': self.document_type,
+            'size': self.total_size,
+            'offset': self.received,
+            'status': self.status,
+            'document_id': self.document_id,
+            'job_id': self.document.ocr_job.id if self.document and self.document.ocr_job else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class PortfolioSummary(db.Model):
+    """Single-row table of portfolio counters, kept in step with loans and repayments on every flush"""
+    __tablename__ = 'portfolio_summary'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    total_loans = db.Column(db.Integer, nullable=False, default=0)
+    active_loans = db.Column(db.Integer, nullable=False, default=0)
+    pending_applications = db.Column(db.Integer, nullable=False, default=0)
+    total_disbursed = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_repayments = db.Column(db.Integer, nullable=False, default=0)
+    ontime_repayments = db.Column(db.Integer, nullable=False, default=0)
+    late_repayments = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LoanDelinquency(db.Model):
+    """Latest arrears position of each active loan, written by the delinquency batch"""
+    __tablename__ = 'loan_delinquency'
+    
+    loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'), primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)
+    expected_amount = db.Column(db.Numeric(12, 2), nullable=False)  # instalments due by as_of
+    paid_amount = db.Column(db.Numeric(12, 2), nullable=False)
+    arrears_amount = db.Column(db.Numeric(12, 2), nullable=False)
+    oldest_unpaid_due_date = db.Column(db.Date)
+    days_past_due = db.Column(db.Integer, nullable=False, default=0)
+    bucket = db.Column(db.String(10), nullable=False, index=True)  # current, 1-29, 30-59, 60-89, 90+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    loan = db.relationship('Loan', backref=db.backref('delinquency', uselist=False))
+    
+    def to_dict(self):
+        """Convert delinquency object to dictionary for API responses"""
+        return {
+            'loan_id': self.loan_id,
+            'as_of': self.as_of.isoformat(),
+            'expected_amount': str(self.expected_amount),
+            'paid_amount': str(self.paid_amount),
+            'arrears_amount': str(self.arrears_amount),
+            'oldest_unpaid_due_date': self.oldest_unpaid_due_date.isoformat() if self.oldest_unpaid_due_date else None,
+            'days_past_due': self.days_past_due,
+            'bucket': self.bucket
+        }
+
+class DelinquencyRun(db.Model):
+    """Checkpoint of a delinquency batch run"""
+    __tablename__ = 'delinquency_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)
+    mode = db.Column(db.String(20), nullable=False)  # full, incremental
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, completed, failed
+    last_repayment_id = db.Column(db.Integer, nullable=False, default=0)  # repayments up to here are reflected
+    loans_processed = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
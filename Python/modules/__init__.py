@@ -1,4 +1,5 @@
 from . import analytics
 from . import borrowers
+from . import uploads
 
-__all__ = ['analytics', 'borrowers']
+__all__ = ['analytics', 'borrowers', 'uploads']
@@ -1,9 +1,8 @@
-from flask import Blueprint, render_template, current_app
+from flask import Blueprint, render_template, current_app, request
 from flask_login import login_required
-from sqlalchemy import func, text
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, text, case
 from models import db, Loan, Borrower, RepaymentRecord, Document
+from stats import analytics_stats
 
 bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
@@ -11,57 +10,8 @@ bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 @login_required
 def index():
     try:
-        # Loan statistics
-        total_loans = Loan.query.count()
-        active_loans = Loan.query.filter(Loan.status.ilike('%approved%')).count()
-        total_amount = db.session.query(func.sum(Loan.amount)).filter(Loan.status.ilike('%approved%')).scalar() or 0
-        avg_amount = total_amount / active_loans if active_loans > 0 else 0
-        
-        # Monthly loan trends (last 6 months)
-        months = []
-        amounts = []
-        for i in range(5, -1, -1):
-            start_date = datetime.utcnow().replace(day=1) - relativedelta(months=i)
-            end_date = (start_date + relativedelta(months=1)).replace(hour=23, minute=59, second=59)
-            
-            month_amount = db.session.query(func.sum(Loan.amount))\
-                .filter(Loan.created_at.between(start_date, end_date))\
-                .scalar() or 0
-                
-            months.append(start_date.strftime('%B'))
-            amounts.append(float(month_amount))
-        
-        # Loan type distribution
-        loan_types = ['School Fees', 'Medical', 'Vacation', 'Funeral', 'Customary']
-        loan_type_distribution = []
-        for loan_type in loan_types:
-            count = Loan.query.filter(
-                Loan.purpose.ilike(f"%{loan_type.lower()}%")
-            ).count()
-            loan_type_distribution.append(count)
-            
-        # Repayment statistics
-        total_repayments = RepaymentRecord.query.count()
-        ontime_payments = RepaymentRecord.query.filter_by(is_late_payment=False).count()
-        late_payments = RepaymentRecord.query.filter_by(is_late_payment=True).count()
-            
-        stats = {
-            'active_loans': active_loans,
-            'avg_loan_amount': float(avg_amount),
-            'total_portfolio': float(total_amount),
-            'total_repayments': total_repayments,
-            'ontime_payment_rate': (ontime_payments / total_repayments * 100) if total_repayments > 0 else 0,
-            'late_payment_rate': (late_payments / total_repayments * 100) if total_repayments > 0 else 0
-        }
-        
-        return render_template(
-            'analytics/index.html',
-            stats=stats,
-            monthly_labels=months,
-            monthly_amounts=amounts,
-            loan_types=loan_types,
-            loan_type_distribution=loan_type_distribution
-        )
+        # Loan and repayment statistics in one aggregate query
+        return render_template('analytics/index.html', **analytics_stats())
         
     except Exception as e:
         print(f"Analytics error: {str(e)}")
@@ -89,7 +39,7 @@ def loan_performance():
         performance_stats = db.session.query(
             func.count(Loan.id).label('total_loans'),
             func.sum(case(
-                [(Loan.status == 'defaulted', 1)],
+                (Loan.status == 'defaulted', 1),
                 else_=0
             )).label('defaulted_loans'),
             func.avg(Loan.amount).label('avg_loan_amount')
@@ -115,3 +65,20 @@ def loan_performance():
                 'avg_loan_amount': 0
             }
         )
+
+@bp.route('/vintage')
+@login_required
+def vintage():
+    # pandas/NumPy are only imported once someone opens this page
+    from vintage import vintage_context
+    segment = request.args.get('segment') or None
+    try:
+        # Cohort curves from the Parquet cache, recomputed only when the data changed
+        return render_template('analytics/vintage.html', **vintage_context(segment))
+    except ValueError as e:
+        return render_template('analytics/vintage.html', segment=None, segments=[], months_on_book=[],
+                               cohorts=[], error=str(e)), 400
+    except Exception:
+        current_app.logger.exception("Vintage analytics error")
+        return render_template('analytics/vintage.html', segment=segment, segments=[], months_on_book=[],
+                               cohorts=[], error='Vintage analysis is unavailable')
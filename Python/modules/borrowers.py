@@ -1,9 +1,11 @@
-from flask import Blueprint, render_template, flash, request, redirect, url_for
-from flask_login import login_required
+from flask import Blueprint, render_template, flash, request, redirect, url_for, current_app, send_from_directory, session, abort
+from flask_login import login_required, current_user
+from markupsafe import Markup
+from werkzeug.utils import secure_filename
 from datetime import datetime
-import io
-import csv
+import os
 from models import db, Borrower, Loan
+from borrower_import import BorrowerImporter
 
 bp = Blueprint('borrowers', __name__, url_prefix='/borrowers')
 
@@ -87,46 +89,37 @@ def bulk_upload_borrowers():
         return redirect(url_for('borrowers.view_borrowers'))
     
     try:
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.DictReader(stream)
+        importer = BorrowerImporter(
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+            report_folder=current_app.config['IMPORT_REPORT_FOLDER']
+        )
+        result = importer.run(file.stream)
         
-        for row in csv_reader:
-            borrower = Borrower(
-                surname=row['surname'],
-                given_name=row['given_name'],
-                date_of_birth=datetime.strptime(row['date_of_birth'], '%Y-%m-%d'),
-                gender=row['gender'],
-                mobile_number=row['mobile_number'],
-                email=row['email'],
-                company_department=row['company_department'],
-                file_number=row['file_number'],
-                position=row['position'],
-                postal_address=row['postal_address'],
-                work_phone=row['work_phone'],
-                date_employed=datetime.strptime(row['date_employed'], '%Y-%m-%d'),
-                paymaster=row['paymaster'],
-                lot=row['lot'],
-                section=row['section'],
-                suburb=row['suburb'],
-                street_name=row['street_name'],
-                marital_status=row['marital_status'],
-                spouse_name=row.get('spouse_name'),
-                spouse_employer=row.get('spouse_employer'),
-                spouse_contact=row.get('spouse_contact'),
-                bank_name=row['bank_name'],
-                bank_branch=row['bank_branch'],
-                bsb_code=row['bsb_code'],
-                account_name=row['account_name'],
-                account_number=row['account_number'],
-                account_type=row['account_type']
-            )
-            db.session.add(borrower)
-        
-        db.session.commit()
-        flash('Borrowers imported successfully', 'success')
+        flash(f"Imported {result['imported']} borrowers", 'success')
+        if result['rejected']:
+            # Only this session (and admins) may download the report; it holds the rejected rows' personal data
+            session['import_reports'] = (session.get('import_reports', []) + [result['report']])[-20:]
+            report_url = url_for('borrowers.import_report', filename=result['report'])
+            flash(Markup(
+                f"{result['rejected']} rows were rejected. "
+                f'<a href="{report_url}" class="underline">Download the rejected rows</a>'
+            ), 'error')
         
     except Exception as e:
         db.session.rollback()
         flash(f'Error importing borrowers: {str(e)}', 'error')
     
     return redirect(url_for('borrowers.view_borrowers'))
+
+@bp.route('/import-reports/<filename>')
+@login_required
+def import_report(filename):
+    filename = secure_filename(filename)
+    if current_user.role != 'admin' and filename not in session.get('import_reports', []):
+        abort(404)
+    return send_from_directory(
+        os.path.abspath(current_app.config['IMPORT_REPORT_FOLDER']),
+        filename,
+        mimetype='text/csv',
+        as_attachment=True
+    )
@@ -0,0 +1,145 @@
+from flask import Blueprint, jsonify, request, session, url_for, current_app
+from flask_login import current_user
+from extensions import db
+from models import UploadSession
+from ocr_queue import enqueue_document
+from upload_store import UploadError, allowed_file, start_upload, claim_chunk, write_chunk, finalize_upload
+
+# Resumable uploads: POST /uploads to start, PUT each chunk at its offset, POST .../finalize.
+# A dropped connection resumes from the offset returned by GET /uploads/<id>.
+bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+
+
+def _get_upload(upload_id):
+    """Return the upload if the current session or user started it, else None."""
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None:
+        return None
+    if upload_id in session.get('uploads', []):
+        return upload
+    if current_user.is_authenticated and upload.user_id == current_user.id:
+        return upload
+    return None
+
+
+def _offset_response(upload, status=200):
+    return jsonify(upload.to_dict()), status, {'Upload-Offset': str(upload.received)}
+
+
+def _finalized_response(upload):
+    """The finalize reply: an OCR job to poll for applications, otherwise the new document."""
+    job = upload.document.ocr_job
+    if job is None:
+        return jsonify({'upload_id': upload.id, 'document_id': upload.document_id, 'status': upload.status}), 201
+    status_url = url_for('upload_application_status', job_id=job.id)
+    return jsonify({
+        'upload_id': upload.id,
+        'document_id': upload.document_id,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': status_url
+    }), 202, {'Location': status_url}
+
+
+@bp.route('', methods=['POST'])
+def create_upload():
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    document_type = data.get('document_type') or 'loan_application'
+    size = data.get('size')
+
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type. Please upload PDF or image files.'}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'error': 'size must be a positive number of bytes'}), 400
+    if size > current_app.config['UPLOAD_MAX_FILE_SIZE']:
+        return jsonify({'error': f"File exceeds {current_app.config['UPLOAD_MAX_FILE_SIZE']} bytes"}), 413
+    # Anonymous clients may only submit loan applications, as on /upload-application
+    if document_type != 'loan_application' and not current_user.is_authenticated:
+        return jsonify({'error': 'Login required'}), 401
+
+    try:
+        upload = start_upload(
+            filename,
+            size,
+            document_type,
+            user_id=current_user.id if current_user.is_authenticated else None,
+            expected_hash=data.get('sha256')
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error starting upload: {str(e)}")
+        return jsonify({'error': 'Failed to start upload'}), 500
+
+    session['uploads'] = (session.get('uploads', []) + [upload.id])[-20:]
+    upload_url = url_for('uploads.upload_chunk', upload_id=upload.id)
+    response = upload.to_dict()
+    response.update({
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE'],
+        'upload_url': upload_url,
+        'finalize_url': url_for('uploads.finalize', upload_id=upload.id)
+    })
+    return jsonify(response), 201, {'Location': upload_url}
+
+
+@bp.route('/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return _offset_response(upload)
+
+
+@bp.route('/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        offset = request.headers.get('Upload-Offset', type=int)
+    length = request.content_length
+    if offset is None:
+        return jsonify({'error': 'offset is required'}), 400
+    if length is None:
+        return jsonify({'error': 'Content-Length is required'}), 411
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify({'error': f"Chunks are limited to {current_app.config['UPLOAD_CHUNK_SIZE']} bytes"}), 413
+    if offset + length > upload.total_size:
+        return jsonify({'error': 'Chunk extends past the declared size'}), 400
+
+    # The offset must be the next byte expected; anything else gets the current offset to resume from
+    claim = claim_chunk(upload, offset)
+    if claim is None:
+        return _offset_response(upload, 409)
+
+    write_chunk(claim, request.stream)
+    return _offset_response(upload)
+
+
+@bp.route('/<upload_id>/finalize', methods=['POST'])
+def finalize(upload_id):
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.status == 'completed':
+        return _finalized_response(upload)
+
+    try:
+        document = finalize_upload(upload)
+        if document.document_type == 'loan_application':
+            job = enqueue_document(document)
+        db.session.commit()
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'offset': upload.received}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error finalizing upload {upload_id}: {str(e)}")
+        return jsonify({'error': 'Failed to finalize upload'}), 500
+
+    if document.document_type == 'loan_application':
+        session['ocr_jobs'] = (session.get('ocr_jobs', []) + [job.id])[-20:]
+    return _finalized_response(upload)
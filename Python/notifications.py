@@ -0,0 +1,41 @@
+from flask import current_app
+from extensions import db
+from models import EmailOutbox
+
+
+def queue_email(recipient, subject, body):
+    """Add an email to the outbox in the current transaction; the email worker delivers it after commit."""
+    message = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        max_attempts=current_app.config['EMAIL_MAX_ATTEMPTS']
+    )
+    db.session.add(message)
+    return message
+
+
+def queue_registration_email(email, username, is_application=False):
+    """Queue the account confirmation email for a newly registered user.
+
+    Args:
+        email: Recipient address
+        username: Username of the new account
+        is_application: True when the account was created from an uploaded loan application
+    """
+    login_url = f"{current_app.config['APP_BASE_URL'].rstrip('/')}/login"
+    if is_application:
+        body = (
+            f"Hello {username},\n\n"
+            "We have received your loan application and created an account for you.\n"
+            "Please log in and change your temporary password, then upload your supporting documents.\n\n"
+            f"Login: {login_url}\n"
+        )
+    else:
+        body = (
+            f"Hello {username},\n\n"
+            "Your account has been created successfully.\n\n"
+            f"Login: {login_url}\n"
+        )
+
+    return queue_email(email, 'Welcome to KNR Financial', body)
@@ -0,0 +1,111 @@
+import os
+import re
+
+import pytesseract
+from flask import current_app
+from pdf2image import convert_from_path
+from PIL import Image
+
+# Labels printed on the K&R personal loan application form -> extracted_data keys
+# (the same names as the fields of the online application and borrower forms)
+FORM_FIELDS = {
+    'Surname': 'surname',
+    'Given Names': 'given_name',
+    'Date of Birth': 'date_of_birth',
+    'Gender': 'gender',
+    'Mobile #': 'mobile_number',
+    'Email': 'email',
+    'Village': 'village',
+    'District': 'district',
+    'Province': 'province',
+    'Nationality': 'nationality',
+    'Department/Company': 'company_department',
+    'File No': 'file_number',
+    'Position': 'position',
+    'Postal Address': 'postal_address',
+    'Phone': 'phone',
+    'Date Employed': 'date_employed',
+    'Paymaster': 'paymaster',
+    'Marital Status': 'marital_status',
+    'Loan Amount': 'loan_amount',
+    'No of Fortnights': 'number_of_fortnights',
+    'Total Loan Repayable': 'total_loan_repayable',
+    'Gross Salary': 'gross_salary',
+    'Net Salary': 'net_salary',
+    'Bank': 'bank',
+    'Branch': 'branch',
+    'BSB Code': 'bsb_code',
+    'Account Name': 'account_name',
+    'Account No': 'account_number',
+    'Account Type': 'account_type',
+}
+
+# The form has two columns, so one OCR line can hold two "Label: value" pairs.
+# Longer labels first so "Loan Amount" is not read as part of another label.
+_LABEL = re.compile(
+    r'(?<![\w/])(' + '|'.join(re.escape(label) for label in sorted(FORM_FIELDS, key=len, reverse=True)) + r')\s*:',
+    re.IGNORECASE
+)
+_LABEL_KEYS = {label.lower(): key for label, key in FORM_FIELDS.items()}
+_BLANK = re.compile(r'[_|]+')
+
+
+class OcrError(Exception):
+    """Raised when a document could not be turned into application data."""
+
+
+def _pages(path):
+    if os.path.splitext(path)[1].lower() == '.pdf':
+        return convert_from_path(path, dpi=current_app.config['OCR_DPI'])
+    return [Image.open(path)]
+
+
+def _read_lines(image):
+    """OCR one page; returns its text lines and the confidence (0-100) of each recognised word."""
+    data = pytesseract.image_to_data(image, lang=current_app.config['OCR_LANGUAGE'], output_type=pytesseract.Output.DICT)
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+        if float(data['conf'][i]) >= 0:
+            confidences.append(float(data['conf'][i]))
+    return [' '.join(words) for words in lines.values()], confidences
+
+
+def parse_form(lines):
+    """Pick the labelled values out of OCR'd form lines. Blank (underscored) fields are left out."""
+    fields = {}
+    for line in lines:
+        matches = list(_LABEL.finditer(line))
+        for match, following in zip(matches, matches[1:] + [None]):
+            value = line[match.end():following.start() if following else len(line)]
+            value = _BLANK.sub(' ', value).strip(' .:')
+            key = _LABEL_KEYS[match.group(1).lower()]
+            if value and key not in fields:
+                fields[key] = ' '.join(value.split())
+    return fields
+
+
+def extract_application(path):
+    """OCR a scanned or photographed application form (PDF or image).
+
+    Returns:
+        (fields, confidence): the parsed form fields and the mean word confidence from 0 to 1
+
+    Raises:
+        OcrError: if no form field could be read
+    """
+    lines, confidences = [], []
+    for page in _pages(path):
+        page_lines, page_confidences = _read_lines(page)
+        lines += page_lines
+        confidences += page_confidences
+
+    fields = parse_form(lines)
+    if not fields:
+        raise OcrError('Could not extract data from document')
+    confidence = sum(confidences) / len(confidences) / 100 if confidences else 0.0
+    return fields, round(confidence, 4)
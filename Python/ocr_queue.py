@@ -0,0 +1,293 @@
+import os
+import signal
+import socket
+import time
+import multiprocessing
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_, func
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models import User, Borrower, Loan, Document, OcrJob
+from notifications import queue_registration_email
+
+
+def enqueue_document(document):
+    """Add an OCR job for `document` to the current transaction."""
+    job = OcrJob(document=document, max_attempts=current_app.config['OCR_MAX_ATTEMPTS'])
+    db.session.add(job)
+    return job
+
+
+def claim_jobs(worker_id, limit=1):
+    """Lock and mark up to `limit` runnable jobs as running for `worker_id`.
+
+    Runnable jobs are pending ones whose backoff has elapsed, plus running ones whose
+    worker has held them longer than OCR_VISIBILITY_TIMEOUT (it is presumed dead).
+    FOR UPDATE SKIP LOCKED lets concurrent workers claim disjoint jobs without blocking.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['OCR_VISIBILITY_TIMEOUT'])
+
+    jobs = OcrJob.query\
+        .filter(or_(
+            and_(OcrJob.status == 'pending', OcrJob.available_at <= now),
+            and_(OcrJob.status == 'running', OcrJob.locked_at < stale)
+        ))\
+        .order_by(OcrJob.available_at, OcrJob.id)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)\
+        .all()
+
+    claimed = []
+    timed_out = []
+    for job in jobs:
+        if job.attempts >= job.max_attempts:
+            # Timed out on its last attempt
+            job.status = 'failed'
+            job.locked_at = None
+            job.last_error = job.last_error or 'Visibility timeout exceeded'
+            timed_out.append(job.document_id)
+            continue
+        job.status = 'running'
+        job.locked_at = now
+        job.locked_by = worker_id
+        job.attempts += 1
+        claimed.append(job)
+
+    for status, document_ids in (('processing', [job.document_id for job in claimed]), ('failed', timed_out)):
+        if document_ids:
+            db.session.query(Document)\
+                .filter(Document.id.in_(document_ids))\
+                .update({'ocr_status': status}, synchronize_session=False)
+
+    db.session.commit()
+    return claimed
+
+
+def create_application_records(document):
+    """Create the user (for anonymous uploads), borrower and loan for an OCR'd application.
+
+    Returns:
+        The newly created User, or None if the document already belonged to a user
+    """
+    data = document.extracted_data
+    user = db.session.get(User, document.user_id) if document.user_id else None
+    created_user = None
+
+    if user is None:
+        # Generate a username from email or use a timestamp
+        email = data.get('email', '')
+        username = email.split('@')[0] if email else f'user_{int(datetime.now().timestamp())}'
+        user = User(
+            username=username,
+            email=email,
+            password_hash=generate_password_hash('password1234'),  # Temporary password
+            role='borrower'
+        )
+        db.session.add(user)
+        db.session.flush()
+        document.user_id = user.id
+        created_user = user
+
+    borrower = Borrower.query.filter_by(user_id=user.id).first()
+    if not borrower:
+        borrower = Borrower(
+            user_id=user.id,
+            full_name=f"{data.get('surname', '')} {data.get('given_name', '')}",
+            email=data.get('email', ''),
+            phone=data.get('mobile_number', ''),
+            position=data.get('position', ''),
+            department=data.get('company_department', ''),
+            employer_name=data.get('paymaster', '')
+        )
+        db.session.add(borrower)
+        db.session.flush()
+
+    loan = Loan(
+        borrower_id=borrower.id,
+        status='pending',
+        amount=0,  # Will be updated later
+        purpose='pending review'
+    )
+    db.session.add(loan)
+    db.session.flush()
+    document.loan_id = loan.id
+
+    return created_user
+
+
+def _still_owned(job_id, worker_id):
+    """Re-lock the job row and check no other worker reclaimed it meanwhile."""
+    owner = db.session.query(OcrJob.locked_by)\
+        .filter(OcrJob.id == job_id, OcrJob.status == 'running')\
+        .with_for_update()\
+        .scalar()
+    return owner == worker_id
+
+
+def _record_failure(job_id, worker_id, error):
+    job = db.session.query(OcrJob).filter_by(id=job_id).with_for_update().first()
+    if job is None or job.locked_by != worker_id:
+        db.session.rollback()
+        return
+
+    job.last_error = error
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        job.document.ocr_status = 'failed'
+    else:
+        backoff = current_app.config['OCR_RETRY_BACKOFF'] * 2 ** (job.attempts - 1)
+        job.status = 'pending'
+        job.available_at = datetime.utcnow() + timedelta(seconds=backoff)
+    db.session.commit()
+
+
+def process_job(job, worker_id):
+    """Run OCR for one claimed job, then create its application records in one transaction.
+
+    OCR runs between transactions, so the worker holds no pooled connection while
+    Tesseract reads the document.
+    """
+    # Imported here so the web role never loads Tesseract and Poppler bindings
+    from ocr import extract_application
+
+    job_id = job.id
+    document_id, file_path = db.session.query(Document.id, Document.file_path)\
+        .filter(Document.id == job.document_id)\
+        .one()
+    db.session.commit()
+
+    try:
+        data, confidence = extract_application(file_path)
+    except Exception as e:
+        current_app.logger.error(f"OCR job {job_id} failed: {str(e)}")
+        _record_failure(job_id, worker_id, str(e))
+        return
+
+    try:
+        if not _still_owned(job_id, worker_id):
+            db.session.rollback()
+            current_app.logger.warning(f"OCR job {job_id} was reclaimed by another worker; discarding result")
+            return
+
+        document = db.session.get(Document, document_id)
+        document.extracted_data = data
+        document.ocr_confidence_score = confidence
+        document.ocr_status = 'completed'
+
+        created_user = create_application_records(document)
+        if created_user is not None:
+            # Delivered by the email worker once this transaction commits
+            queue_registration_email(created_user.email, created_user.username, is_application=True)
+
+        job = db.session.get(OcrJob, job_id)
+        job.status = 'completed'
+        job.locked_at = None
+        job.last_error = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"OCR job {job_id} failed: {str(e)}")
+        _record_failure(job_id, worker_id, str(e))
+
+
+def queue_stats():
+    """Return job counts per status and the age of the oldest runnable job."""
+    rows = db.session.query(OcrJob.status, func.count(OcrJob.id), func.min(OcrJob.available_at))\
+        .group_by(OcrJob.status)\
+        .all()
+
+    stats = {'pending': 0, 'running': 0, 'completed': 0, 'failed': 0, 'oldest_pending_seconds': 0}
+    for status, count, oldest in rows:
+        stats[status] = count
+        if status == 'pending' and oldest is not None:
+            stats['oldest_pending_seconds'] = max(0, (datetime.utcnow() - oldest).total_seconds())
+    stats['depth'] = stats['pending'] + stats['running']
+    return stats
+
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def run_worker(worker_id, poll_interval=2.0, batch_size=1):
+    """Claim and process jobs until SIGTERM/SIGINT. Requires an app context."""
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    current_app.logger.info(f"OCR worker {worker_id} started")
+
+    while not _stopping:
+        jobs = claim_jobs(worker_id, limit=batch_size)
+        if not jobs:
+            db.session.remove()
+            time.sleep(poll_interval)
+            continue
+        for job in jobs:
+            process_job(job, worker_id)
+
+    current_app.logger.info(f"OCR worker {worker_id} stopped")
+
+
+def _worker_main(config_name, index, poll_interval, batch_size):
+    """Entry point of a forked worker process: build its own app and engine."""
+    from app import create_app
+    app = create_app(config_name, role='worker')
+    with app.app_context():
+        db.engine.dispose()
+        run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}", poll_interval, batch_size)
+
+
+@click.command('ocr-worker')
+@click.option('--processes', type=int, default=None, help='Worker processes (default: OCR_WORKER_PROCESSES).')
+@click.option('--batch-size', type=int, default=1, show_default=True, help='Jobs claimed per poll.')
+@with_appcontext
+def ocr_worker_command(processes, batch_size):
+    """Run a pool of OCR worker processes."""
+    processes = processes or current_app.config['OCR_WORKER_PROCESSES']
+    poll_interval = current_app.config['OCR_POLL_INTERVAL']
+    config_name = os.getenv('FLASK_ENV', 'default')
+
+    workers = [
+        multiprocessing.Process(
+            target=_worker_main,
+            args=(config_name, index, poll_interval, batch_size),
+            name=f"ocr-worker-{index}"
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    click.echo(f'Started {processes} OCR workers.')
+
+    def _forward(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for worker in workers:
+        worker.join()
+
+
+@click.command('ocr-queue-stats')
+@with_appcontext
+def ocr_queue_stats_command():
+    """Print OCR queue depth and job counts."""
+    for key, value in queue_stats().items():
+        click.echo(f'{key}: {value}')
+
+
+def init_ocr_queue(app):
+    """Register the OCR worker and queue stats commands."""
+    app.cli.add_command(ocr_worker_command)
+    app.cli.add_command(ocr_queue_stats_command)
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+ORDER_COLUMNS = ('id', 'created_at')
+
+
+def encode_cursor(order, value, row_id):
+    """Build an opaque cursor pointing just after (value, row_id)."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'o': order, 'v': value, 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, order):
+    """Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the token is malformed or was issued for another ordering
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_order, value, row_id = payload['o'], payload['v'], int(payload['i'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if cursor_order != order:
+        raise ValueError('Cursor was issued for a different ordering')
+    if order == 'created_at':
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+    return value, row_id
+
+
+def keyset_paginate(query, model, after=None, limit=10, order='id', with_total=False):
+    """Fetch one page of `query` ordered by `order` using a keyset cursor.
+
+    Unlike OFFSET pagination, each page is an index range scan that starts after
+    the previous page's last key, so deep pages cost the same as the first.
+
+    Args:
+        query: Filtered model query to page through
+        model: Mapped class providing the `id` and `order` columns
+        after: Cursor returned by the previous page, or None for the first page
+        limit: Page size
+        order: 'id' or 'created_at'
+        with_total: Also run a COUNT(*) over the filtered query
+
+    Returns:
+        (items, pagination) where pagination holds 'next', 'limit' and optionally 'total'
+    """
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    if order not in ORDER_COLUMNS:
+        raise ValueError(f"order must be one of: {', '.join(ORDER_COLUMNS)}")
+
+    id_column = model.id
+    if order == 'id':
+        keys = (id_column,)
+    else:
+        keys = (getattr(model, order), id_column)
+
+    pagination = {'limit': limit}
+    if with_total:
+        pagination['total'] = query.order_by(None).count()
+
+    if after:
+        value, row_id = decode_cursor(after, order)
+        if order == 'id':
+            query = query.filter(id_column > row_id)
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(value, row_id))
+
+    # Replace any relevance ordering: cursors only make sense over the key columns
+    rows = query.order_by(None).order_by(*keys).limit(limit + 1).all()
+    items = rows[:limit]
+
+    pagination['next'] = None
+    if len(rows) > limit:
+        last = items[-1]
+        pagination['next'] = encode_cursor(order, getattr(last, order), last.id)
+
+    return items, pagination
@@ -0,0 +1,198 @@
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, inspect, update
+from extensions import db, stats_cache
+from models import Loan, RepaymentRecord, PortfolioSummary
+
+SUMMARY_ID = 1
+COUNTERS = [
+    'total_loans',
+    'active_loans',
+    'pending_applications',
+    'total_disbursed',
+    'total_repayments',
+    'ontime_repayments',
+    'late_repayments',
+]
+
+
+def _loan_contribution(status, amount):
+    """Counters a single loan adds to the summary."""
+    approved = status == 'approved'
+    return {
+        'total_loans': 1,
+        'active_loans': 1 if approved else 0,
+        'pending_applications': 1 if status == 'pending' else 0,
+        'total_disbursed': Decimal(amount or 0) if approved else Decimal(0),
+    }
+
+
+def _repayment_contribution(is_late_payment):
+    """Counters a single repayment adds to the summary."""
+    return {
+        'total_repayments': 1,
+        'ontime_repayments': 1 if is_late_payment is False else 0,
+        'late_repayments': 1 if is_late_payment is True else 0,
+    }
+
+
+def _values(obj, attrs, committed):
+    """Current (or pre-flush when `committed`) values of `attrs` on `obj`."""
+    state = inspect(obj)
+    values = []
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if committed:
+            current = history.deleted or history.unchanged
+        else:
+            current = history.added or history.unchanged
+        values.append(current[0] if current else None)
+    return values
+
+
+def _changed(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _accumulate(delta, contribution, sign):
+    for key, value in contribution.items():
+        delta[key] = delta.get(key, 0) + sign * value
+
+
+TRACKED = {
+    Loan: (('status', 'amount'), _loan_contribution),
+    RepaymentRecord: (('is_late_payment',), _repayment_contribution),
+}
+
+
+def _before_flush(session, flush_context, instances):
+    """Load tracked attributes of deleted rows while they can still be read."""
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            for attr in tracked[0]:
+                getattr(obj, attr)
+
+
+def _after_flush(session, flush_context):
+    """Apply the counter deltas of this flush to the summary row in the same transaction.
+
+    ORM bulk updates (``Query.update``) bypass flush events; run
+    ``flask reconcile-portfolio`` after those.
+    """
+    delta = {}
+
+    for obj in session.new:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            attrs, contribution = tracked
+            _accumulate(delta, contribution(*_values(obj, attrs, committed=False)), 1)
+
+    for obj in session.dirty:
+        tracked = TRACKED.get(type(obj))
+        if tracked and _changed(obj, tracked[0]):
+            attrs, contribution = tracked
+            _accumulate(delta, contribution(*_values(obj, attrs, committed=True)), -1)
+            _accumulate(delta, contribution(*_values(obj, attrs, committed=False)), 1)
+
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            attrs, contribution = tracked
+            _accumulate(delta, contribution(*_values(obj, attrs, committed=True)), -1)
+
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+
+    # Relative increments keep concurrent transactions from overwriting each other
+    values = {key: getattr(PortfolioSummary, key) + value for key, value in delta.items()}
+    values['updated_at'] = datetime.utcnow()
+    session.connection().execute(
+        update(PortfolioSummary)
+        .where(PortfolioSummary.id == SUMMARY_ID)
+        .values(**values)
+    )
+
+
+def get_summary():
+    """Return the portfolio summary row, or None if it has not been built yet."""
+    return db.session.get(PortfolioSummary, SUMMARY_ID)
+
+
+def compute_summary():
+    """Recompute every counter from the loans and repayment_records tables."""
+    approved = Loan.status == 'approved'
+    loans = db.session.query(
+        func.count(Loan.id),
+        func.sum(case((approved, 1), else_=0)),
+        func.sum(case((Loan.status == 'pending', 1), else_=0)),
+        func.sum(case((approved, Loan.amount), else_=0)),
+    ).one()
+    repayments = db.session.query(
+        func.count(RepaymentRecord.id),
+        func.sum(case((RepaymentRecord.is_late_payment.is_(False), 1), else_=0)),
+        func.sum(case((RepaymentRecord.is_late_payment.is_(True), 1), else_=0)),
+    ).one()
+
+    values = [int(value or 0) for value in loans[:3]]
+    values.append(Decimal(loans[3] or 0))
+    values += [int(value or 0) for value in repayments]
+    return dict(zip(COUNTERS, values))
+
+
+def reconcile_summary():
+    """Rebuild the summary row from scratch.
+
+    Returns:
+        dict mapping each drifted counter to a (stored, actual) pair
+    """
+    # Lock the row first so flushes committed during the rebuild are not lost
+    summary = db.session.query(PortfolioSummary)\
+        .filter_by(id=SUMMARY_ID)\
+        .with_for_update()\
+        .first()
+    actual = compute_summary()
+
+    if summary is None:
+        summary = PortfolioSummary(id=SUMMARY_ID)
+        db.session.add(summary)
+        drift = {key: (None, value) for key, value in actual.items()}
+    else:
+        drift = {
+            key: (getattr(summary, key), value)
+            for key, value in actual.items()
+            if getattr(summary, key) != value
+        }
+
+    for key, value in actual.items():
+        setattr(summary, key, value)
+    summary.updated_at = datetime.utcnow()
+    db.session.commit()
+    stats_cache.invalidate('portfolio_totals', 'repayment_rates')
+    return drift
+
+
+@click.command('reconcile-portfolio')
+@with_appcontext
+def reconcile_portfolio_command():
+    """Rebuild the portfolio_summary table and report any drift."""
+    drift = reconcile_summary()
+    if not drift:
+        click.echo('Portfolio summary is in sync.')
+        return
+    for key, (stored, actual) in drift.items():
+        click.echo(f'{key}: stored={stored} actual={actual}')
+    click.echo(f'Rebuilt portfolio summary ({len(drift)} counters drifted).')
+
+
+def init_portfolio_summary(app):
+    """Register the summary flush hook and the reconciliation command."""
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(reconcile_portfolio_command)
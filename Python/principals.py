@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from extensions import db
+from models import User
+
+# User columns a cached principal is built from; changing any of them invalidates it
+PRINCIPAL_FIELDS = ('role', 'username', 'password_hash')
+
+
+class UserPrincipal(UserMixin):
+    """Lightweight stand-in for the logged-in User: id, role and username.
+
+    Any other attribute (email, borrower, ...) loads the full ORM User on first
+    use, so routes that only check `current_user.role` or `current_user.id`
+    never touch the database.
+    """
+
+    def __init__(self, id, role, username):
+        self.id = id
+        self.role = role
+        self.username = username
+        self._user = None
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<UserPrincipal {self.id} {self.username} ({self.role})>'
+
+
+class PrincipalCache:
+    """Per-process TTL/LRU cache of (role, username) by user id.
+
+    Entries are dropped when a commit changes the user's role, username or
+    password (or deletes the user). Other processes only notice such changes
+    when their copy expires, so the TTL bounds how long a revoked role survives.
+    """
+
+    def __init__(self, ttl=30, maxsize=10000, enabled=True):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the cache from USER_CACHE_* settings."""
+        self.enabled = app.config.get('USER_CACHE_ENABLED', True)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.maxsize = app.config.get('USER_CACHE_MAXSIZE', self.maxsize)
+        self.clear()
+
+    def get(self, user_id):
+        """Return (role, username) for `user_id`, or None when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+
+    def set(self, user_id, role, username):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[user_id] = ((role, username), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+principal_cache = PrincipalCache()
+
+
+def load_principal(user_id):
+    """Flask-Login user loader: a cached UserPrincipal, or None for unknown ids."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    cached = principal_cache.get(user_id) if principal_cache.enabled else None
+    if cached is None:
+        row = db.session.query(User.role, User.username).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        cached = (row.role, row.username)
+        principal_cache.set(user_id, *cached)
+    return UserPrincipal(user_id, *cached)
+
+
+def _record_changes(session, flush_context):
+    """Remember users whose principal fields this transaction changed."""
+    touched = session.info.setdefault('principals_touched', set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+                touched.add(obj.id)
+
+
+def _invalidate_touched(session):
+    touched = session.info.pop('principals_touched', None)
+    if touched:
+        principal_cache.invalidate(*touched)
+
+
+def _forget_changes(session):
+    session.info.pop('principals_touched', None)
+
+
+def init_principal_cache(app, login_manager):
+    """Serve Flask-Login from the principal cache and invalidate it on user writes."""
+    principal_cache.init_app(app)
+    login_manager.user_loader(load_principal)
+    for name, listener in (('after_flush', _record_changes),
+                           ('after_commit', _invalidate_touched),
+                           ('after_rollback', _forget_changes)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,108 @@
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, update
+from config import Config
+from extensions import db, stats_cache
+from models import Loan
+
+
+def get_categories():
+    """Return the configured {label: keywords} purpose categories."""
+    if has_app_context():
+        return current_app.config.get('LOAN_PURPOSE_CATEGORIES', Config.LOAN_PURPOSE_CATEGORIES)
+    return Config.LOAN_PURPOSE_CATEGORIES
+
+
+def get_default_category():
+    if has_app_context():
+        return current_app.config.get('LOAN_PURPOSE_DEFAULT_CATEGORY', Config.LOAN_PURPOSE_DEFAULT_CATEGORY)
+    return Config.LOAN_PURPOSE_DEFAULT_CATEGORY
+
+
+def classify_purpose(purpose):
+    """Map a free-text loan purpose to its category label.
+
+    The first category with a keyword contained in the purpose wins.
+    """
+    if purpose:
+        text = purpose.lower()
+        for label, keywords in get_categories().items():
+            if any(keyword.lower() in text for keyword in keywords):
+                return label
+    return get_default_category()
+
+
+def _category_expression():
+    """SQL CASE mirroring classify_purpose, used for bulk backfills."""
+    purpose = func.lower(Loan.purpose)
+    whens = [
+        (purpose.contains(keyword.lower(), autoescape=True), label)
+        for label, keywords in get_categories().items()
+        for keyword in keywords
+    ]
+    if not whens:
+        return get_default_category()
+    return case(*whens, else_=get_default_category())
+
+
+def _set_category(mapper, connection, target):
+    target.purpose_category = classify_purpose(target.purpose)
+
+
+def backfill_categories(batch_size=10000, reclassify=False):
+    """Classify existing loans in id-range batches with set-based UPDATEs.
+
+    Args:
+        batch_size: Number of ids covered by each UPDATE
+        reclassify: Recompute every row, e.g. after the category list changed
+
+    Returns:
+        Number of rows updated
+    """
+    max_id = db.session.query(func.max(Loan.id)).scalar() or 0
+    category = _category_expression()
+    updated = 0
+
+    for start in range(0, max_id + 1, batch_size):
+        stmt = update(Loan)\
+            .where(Loan.id >= start, Loan.id < start + batch_size)\
+            .values(purpose_category=category)\
+            .execution_options(synchronize_session=False)
+        if not reclassify:
+            stmt = stmt.where(Loan.purpose_category.is_(None))
+        updated += db.session.execute(stmt).rowcount
+        db.session.commit()
+
+    # Bulk UPDATEs bypass the session events that invalidate the cache
+    stats_cache.invalidate('type_distribution')
+    return updated
+
+
+def category_distribution():
+    """Return loan counts per configured category label using one GROUP BY."""
+    counts = dict(
+        db.session.query(Loan.purpose_category, func.count(Loan.id))
+        .group_by(Loan.purpose_category)
+        .all()
+    )
+    labels = list(get_categories())
+    return labels, [counts.get(label, 0) for label in labels]
+
+
+@click.command('backfill-purpose-categories')
+@click.option('--batch-size', default=10000, show_default=True, help='Loan ids per UPDATE.')
+@click.option('--reclassify', is_flag=True, help='Recompute categories for every loan.')
+@with_appcontext
+def backfill_purpose_categories_command(batch_size, reclassify):
+    """Populate loans.purpose_category for existing rows."""
+    updated = backfill_categories(batch_size=batch_size, reclassify=reclassify)
+    click.echo(f'Classified {updated} loans.')
+
+
+def init_purpose_categories(app):
+    """Classify Loan.purpose on write and register the backfill command."""
+    if not event.contains(Loan, 'before_insert', _set_category):
+        event.listen(Loan, 'before_insert', _set_category)
+        event.listen(Loan, 'before_update', _set_category)
+    app.cli.add_command(backfill_purpose_categories_command)
@@ -0,0 +1,48 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in test mode when a request runs more SQL statements than its budget."""
+
+
+def query_budget(limit):
+    """Give one view its own budget instead of QUERY_BUDGET."""
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+def _start_counting():
+    g.query_count = 0
+
+
+def _check_budget(response):
+    if 'query_count' not in g or request.endpoint is None:
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    limit = getattr(view, 'query_budget', current_app.config['QUERY_BUDGET'])
+    if g.query_count > limit:
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} ran {g.query_count} SQL statements (budget {limit}); "
+            "check for lazy loads in a loop or raise the limit with @query_budget"
+        )
+    return response
+
+
+def init_query_budget(app):
+    """Fail requests that exceed QUERY_BUDGET statements. Only enabled when the budget is set."""
+    if not app.config.get('QUERY_BUDGET'):
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+    app.before_request(_start_counting)
+    app.after_request(_check_budget)
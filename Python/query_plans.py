@@ -0,0 +1,120 @@
+import re
+import sys
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, text, func
+from extensions import db
+from models import Loan, RepaymentRecord, Document, PortfolioSummary
+from stats import _trend_block, _repayment_block, _document_stats_block
+
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def _aggregate(block):
+    """The statement a stats block runs inside stats._run (requires an app context)."""
+    columns, _, *where = block
+    return select(*columns).where(*where)
+
+
+def hot_queries():
+    """The dashboard, admin listing, API and export queries that must be served by an index.
+
+    The dashboard aggregates read every row they count, so for them an index-only scan
+    of a covering index is the plan to expect rather than a seek.
+    """
+    now = datetime.utcnow()
+    return {
+        'dashboard: portfolio summary row': select(PortfolioSummary).where(PortfolioSummary.id == 1),
+        'dashboard: monthly loan trend': _aggregate(_trend_block()),
+        'dashboard: loan purpose categories': select(Loan.purpose_category, func.count(Loan.id))
+            .group_by(Loan.purpose_category),
+        'dashboard: repayment rates': _aggregate(_repayment_block()),
+        'dashboard: document stats': _aggregate(_document_stats_block()),
+        'dashboard: recent applications': select(Loan).order_by(Loan.created_at.desc()).limit(5),
+        'admin_loans: page': select(Loan).order_by(Loan.created_at.desc(), Loan.id.desc()).limit(50),
+        'api_get_loans: status filter': select(Loan).where(Loan.status == 'pending').limit(10),
+        'api_get_loans: status + created_at cursor': select(Loan)
+            .where(Loan.status == 'pending', Loan.created_at > now - timedelta(days=30))
+            .order_by(Loan.created_at, Loan.id)
+            .limit(10),
+        'borrower loans': select(Loan).where(Loan.borrower_id == 1),
+        'loan repayments': select(RepaymentRecord).where(RepaymentRecord.loan_id == 1),
+        'loan late repayments': select(RepaymentRecord)
+            .where(RepaymentRecord.loan_id == 1, RepaymentRecord.is_late_payment.is_(True)),
+        'export: repayments by payment date': select(RepaymentRecord)
+            .where(RepaymentRecord.payment_date >= now - timedelta(days=1), RepaymentRecord.payment_date < now),
+        'user documents': select(Document)
+            .where(Document.user_id == 1)
+            .order_by(Document.uploaded_at.desc()),
+        'loan documents': select(Document).where(Document.loan_id == 1),
+        'pending documents': select(Document)
+            .where(Document.ocr_status == 'pending')
+            .order_by(Document.created_at)
+            .limit(100),
+    }
+
+
+def _plan_problems(connection, statement):
+    """Return (plan lines, full-scanned tables) for one statement on the current dialect."""
+    dialect = connection.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect.name == 'postgresql':
+        plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()[0]['Plan']
+        lines, scanned = [], []
+        nodes = [plan]
+        while nodes:
+            node = nodes.pop()
+            relation = node.get('Relation Name')
+            lines.append(f"{node['Node Type']}{' on ' + relation if relation else ''}")
+            if node['Node Type'] == 'Seq Scan':
+                scanned.append(relation)
+            nodes.extend(node.get('Plans', []))
+        return lines, scanned
+
+    lines = [row[3] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    scanned = [match.group(1) for match in map(_SQLITE_FULL_SCAN.match, lines) if match]
+    return lines, scanned
+
+
+def check_query_plans(analyze=False):
+    """EXPLAIN every hot query and report the ones that fall back to a full table scan.
+
+    Planners prefer sequential scans on small tables, so run this against a seeded
+    database of realistic size.
+
+    Returns:
+        dict mapping query name to (plan lines, full-scanned tables)
+    """
+    connection = db.session.connection()
+    if analyze:
+        connection.execute(text('ANALYZE'))
+    return {name: _plan_problems(connection, statement) for name, statement in hot_queries().items()}
+
+
+@click.command('check-query-plans')
+@click.option('--analyze', is_flag=True, help='Refresh planner statistics first.')
+@click.option('--verbose', is_flag=True, help='Print the plan of every query.')
+@with_appcontext
+def check_query_plans_command(analyze, verbose):
+    """Fail if a hot dashboard/API query is planned as a full table scan."""
+    failed = 0
+    for name, (lines, scanned) in check_query_plans(analyze=analyze).items():
+        if scanned:
+            failed += 1
+            click.echo(f"FAIL  {name}: full scan of {', '.join(scanned)}")
+        else:
+            click.echo(f"ok    {name}")
+        if verbose or scanned:
+            for line in lines:
+                click.echo(f"        {line}")
+    if failed:
+        click.echo(f'{failed} queries are not using an index.')
+        sys.exit(1)
+
+
+def init_query_plans(app):
+    """Register the EXPLAIN-based index check."""
+    app.cli.add_command(check_query_plans_command)
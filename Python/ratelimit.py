@@ -0,0 +1,174 @@
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from math import floor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from flask import request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_login import current_user
+from limits.storage import Storage, SlidingWindowCounterSupport, storage_from_string
+
+# Limit passed when flushing so the shared store always accepts the batch
+_NO_LIMIT = 2 ** 53
+
+
+def rate_limit_key():
+    """Limit per API key or logged-in user, falling back to the client address for anonymous traffic."""
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key == os.getenv('API_KEY'):
+        return 'key:' + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return f'ip:{get_remote_address()}'
+
+
+class BatchedStorage(Storage, SlidingWindowCounterSupport):
+    """Sliding-window counters checked locally and flushed to a shared store in batches.
+
+    Wraps another limits storage, e.g. ``batched+redis://host:6379/0?flush_interval=1&flush_size=20``.
+    Each process decides against the last shared snapshot of a key plus its own
+    unflushed hits. Pending hits are pushed (one atomic increment per key) once
+    `flush_size` have accumulated or the snapshot is `flush_interval` seconds old.
+    Across N processes a client can overshoot a limit by at most N * flush_size,
+    in exchange for one round trip per batch instead of one per request.
+    """
+
+    STORAGE_SCHEME = ['batched+memory', 'batched+redis', 'batched+rediss', 'batched+redis+cluster',
+                      'batched+redis+sentinel', 'batched+memcached']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        scheme, netloc, path, query, fragment = urlsplit(uri)
+        params = dict(parse_qsl(query))
+        self.flush_interval = float(params.pop('flush_interval', 1))
+        self.flush_size = int(params.pop('flush_size', 20))
+        inner_uri = urlunsplit((scheme[len('batched+'):], netloc, path, urlencode(params), fragment))
+        self.storage = storage_from_string(inner_uri, wrap_exceptions=wrap_exceptions, **options)
+        self._windows = {}  # (key, expiry) -> [window index, previous, current, pending, fetched_at]
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    @property
+    def base_exceptions(self):
+        return self.storage.base_exceptions
+
+    def _flush(self, key, expiry, entry, now):
+        """Push pending hits for one key and refresh its snapshot from the shared store."""
+        if entry[3]:
+            self.storage.acquire_sliding_window_entry(key, _NO_LIMIT, expiry, entry[3])
+        previous, _, current, _ = self.storage.get_sliding_window(key, expiry)
+        entry[:] = [int(now // expiry), previous, current, 0, time.monotonic()]
+
+    def _entry(self, key, expiry, now):
+        entry = self._windows.get((key, expiry))
+        if entry is None:
+            entry = self._windows[(key, expiry)] = [None, 0, 0, 0, 0.0]
+        if (entry[0] != int(now // expiry) or entry[3] >= self.flush_size
+                or time.monotonic() - entry[4] >= self.flush_interval):
+            self._flush(key, expiry, entry, now)
+        return entry
+
+    @staticmethod
+    def _weighted(entry, expiry, now):
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if entry[1] else 0.0
+        return entry[1] * previous_ttl / expiry + entry[2] + entry[3]
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._lock:
+            self._sweep()
+            entry = self._entry(key, expiry, now)
+            if floor(self._weighted(entry, expiry, now)) + amount > limit:
+                return False
+            entry[3] += amount
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        with self._lock:
+            entry = self._entry(key, expiry, now)
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if entry[1] else 0.0
+            current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+            return entry[1], previous_ttl, entry[2] + entry[3], current_ttl
+
+    def clear_sliding_window(self, key, expiry):
+        with self._lock:
+            self._windows.pop((key, expiry), None)
+        self.storage.clear_sliding_window(key, expiry)
+
+    def _sweep(self):
+        """Flush every key with pending hits and drop idle snapshots, at most once per flush_interval."""
+        if time.monotonic() - self._last_sweep < self.flush_interval:
+            return
+        now = time.time()
+        for (key, expiry), entry in list(self._windows.items()):
+            if entry[3]:
+                self._flush(key, expiry, entry, now)
+            elif time.monotonic() - entry[4] > 2 * expiry:
+                del self._windows[(key, expiry)]
+        self._last_sweep = time.monotonic()
+
+    def flush(self):
+        """Push all pending hits now (e.g. before a worker exits)."""
+        now = time.time()
+        with self._lock:
+            for (key, expiry), entry in list(self._windows.items()):
+                if entry[3]:
+                    self._flush(key, expiry, entry, now)
+
+    def incr(self, key, expiry, amount=1):
+        return self.storage.incr(key, expiry, amount=amount)
+
+    def get(self, key):
+        return self.storage.get(key)
+
+    def get_expiry(self, key):
+        return self.storage.get_expiry(key)
+
+    def check(self):
+        return self.storage.check()
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+        return self.storage.reset()
+
+    def clear(self, key):
+        self.storage.clear(key)
+
+
+limiter = Limiter(key_func=rate_limit_key)
+
+
+def flush_rate_limits():
+    """Push hits still buffered by a batched storage to the shared store; a no-op for other storages."""
+    storage = limiter.storage
+    if isinstance(storage, BatchedStorage):
+        storage.flush()
+
+
+def _flush_at_exit():
+    try:
+        flush_rate_limits()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not flush rate limit counters: {str(e)}")
+
+
+def init_rate_limiting(app):
+    """Apply the default limit to every route, counted in RATELIMIT_STORAGE_URI with RATELIMIT_STRATEGY."""
+    app.config.setdefault(
+        'RATELIMIT_DEFAULT',
+        f"{app.config['RATELIMIT_MAX_REQUESTS']} per {int(app.config['RATELIMIT_WINDOW'])} seconds"
+    )
+    limiter.init_app(app)
+    # gunicorn.conf.py also flushes in worker_exit; a second flush finds nothing pending
+    atexit.unregister(_flush_at_exit)
+    atexit.register(_flush_at_exit)
+    return limiter
@@ -0,0 +1,215 @@
+import time
+from datetime import datetime
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, func
+from bulk import bulk_insert
+from extensions import db
+from models import Loan, RepaymentRecord, ExpectedInstalment
+
+PERIODS_PER_YEAR = {'weekly': 52, 'fortnightly': 26, 'monthly': 12}
+PERIOD_DAYS = {'weekly': 7, 'fortnightly': 14}
+DEFAULT_FREQUENCY = 'fortnightly'
+
+
+def amortize(principal, annual_rate, term, frequency=DEFAULT_FREQUENCY):
+    """Build level-payment amortization tables for many loans in one vectorized pass.
+
+    Args:
+        principal: Loan amounts, shape (n,)
+        annual_rate: Annual interest rates in percent, shape (n,)
+        term: Number of repayment periods per loan, shape (n,)
+        frequency: 'weekly', 'fortnightly' or 'monthly'
+
+    Returns:
+        dict of 'payment', 'principal', 'interest' and 'balance' arrays of shape
+        (n, max(term)) rounded to cents, plus a boolean 'mask' marking the periods
+        that exist for each loan. The final instalment absorbs rounding so every
+        balance ends at exactly zero.
+    """
+    amount = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(annual_rate, dtype=np.float64) / 100 / PERIODS_PER_YEAR[frequency]
+    periods = np.asarray(term, dtype=np.int64)
+
+    k = np.arange(1, periods.max() + 1)
+    rate_2d = rate[:, None]
+    growth = (1 + rate_2d) ** k
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        level = np.where(rate > 0, amount * rate / (1 - (1 + rate) ** -periods), amount / periods)
+        level = np.round(level, 2)
+        balance = np.where(
+            rate_2d > 0,
+            amount[:, None] * growth - level[:, None] * (growth - 1) / rate_2d,
+            amount[:, None] - level[:, None] * k
+        )
+
+    balance = np.round(balance, 2)
+    opening = np.concatenate([amount[:, None], balance[:, :-1]], axis=1)
+    interest = np.round(opening * rate_2d, 2)
+    principal_part = opening - balance
+    payment = principal_part + interest
+
+    # Close out the last instalment exactly
+    last = k == periods[:, None]
+    principal_part = np.where(last, opening, principal_part)
+    payment = np.where(last, opening + interest, payment)
+    balance = np.where(last, 0.0, balance)
+
+    return {
+        'payment': np.round(payment, 2),
+        'principal': np.round(principal_part, 2),
+        'interest': interest,
+        'balance': balance,
+        'mask': k <= periods[:, None],
+    }
+
+
+def due_dates(start, term, frequency=DEFAULT_FREQUENCY):
+    """Due dates of instalments 1..max(term) for each start date, shape (n, max(term)).
+
+    Monthly schedules keep the start day of month, clamped to shorter months.
+    """
+    start = np.asarray(start, dtype='datetime64[D]')
+    k = np.arange(1, int(np.max(term)) + 1)
+
+    if frequency in PERIOD_DAYS:
+        return start[:, None] + k * np.timedelta64(PERIOD_DAYS[frequency], 'D')
+
+    months = start.astype('datetime64[M]')
+    day = (start - months.astype('datetime64[D]')).astype(np.int64)
+    target = months[:, None] + k
+    month_length = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+    return target.astype('datetime64[D]') + np.minimum(day[:, None], month_length - 1)
+
+
+def _schedule_rows(loans, frequency):
+    """Flatten the schedules of same-frequency loans into expected_instalments rows."""
+    ids = np.array([loan.id for loan in loans])
+    term = np.array([loan.term for loan in loans])
+    table = amortize(
+        [loan.amount for loan in loans],
+        [loan.interest_rate or 0 for loan in loans],
+        term,
+        frequency
+    )
+    dates = due_dates([loan.start.date() for loan in loans], term, frequency)
+
+    loan_index, period_index = np.nonzero(table['mask'])
+    columns = zip(
+        ids[loan_index].tolist(),
+        (period_index + 1).tolist(),
+        dates[loan_index, period_index].tolist(),
+        table['payment'][loan_index, period_index].tolist(),
+        table['principal'][loan_index, period_index].tolist(),
+        table['interest'][loan_index, period_index].tolist(),
+        table['balance'][loan_index, period_index].tolist(),
+    )
+    keys = ('loan_id', 'instalment_number', 'due_date', 'payment', 'principal', 'interest', 'balance')
+    return [dict(zip(keys, values)) for values in columns]
+
+
+def generate_schedules(loan_ids=None, statuses=('approved',), batch_size=2000):
+    """(Re)build expected_instalments for loans, one id-ordered batch per transaction.
+
+    Returns:
+        (number of loans scheduled, number of instalments written)
+    """
+    query = select(
+        Loan.id,
+        Loan.amount,
+        Loan.interest_rate,
+        Loan.term,
+        func.coalesce(Loan.repayment_frequency, DEFAULT_FREQUENCY).label('frequency'),
+        func.coalesce(Loan.approved_at, Loan.created_at).label('start'),
+    ).where(Loan.status.in_(statuses), Loan.term > 0, Loan.amount > 0)
+    if loan_ids is not None:
+        query = query.where(Loan.id.in_(loan_ids))
+
+    loans_done = instalments_done = 0
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            query.where(Loan.id > last_id).order_by(Loan.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        by_frequency = {}
+        for loan in batch:
+            by_frequency.setdefault(loan.frequency, []).append(loan)
+
+        rows = []
+        for frequency, loans in by_frequency.items():
+            if frequency not in PERIODS_PER_YEAR:
+                raise ValueError(f"Unsupported repayment frequency: {frequency}")
+            rows += _schedule_rows(loans, frequency)
+
+        db.session.execute(
+            delete(ExpectedInstalment).where(ExpectedInstalment.loan_id.in_([loan.id for loan in batch]))
+        )
+        bulk_insert(ExpectedInstalment.__table__, rows)
+        db.session.commit()
+
+        loans_done += len(batch)
+        instalments_done += len(rows)
+
+    return loans_done, instalments_done
+
+
+def expected_vs_paid(as_of=None, loan_ids=None):
+    """Compare instalments due by `as_of` with repayments received, per loan.
+
+    Returns:
+        list of dicts with 'loan_id', 'expected', 'paid' and 'shortfall'
+    """
+    as_of = as_of or datetime.utcnow()
+    expected = select(
+        ExpectedInstalment.loan_id,
+        func.sum(ExpectedInstalment.payment).label('amount')
+    ).where(ExpectedInstalment.due_date <= as_of.date())\
+        .group_by(ExpectedInstalment.loan_id)\
+        .subquery()
+    paid = select(
+        RepaymentRecord.loan_id,
+        func.sum(RepaymentRecord.amount).label('amount')
+    ).where(RepaymentRecord.payment_date <= as_of)\
+        .group_by(RepaymentRecord.loan_id)\
+        .subquery()
+
+    query = select(
+        expected.c.loan_id,
+        expected.c.amount,
+        func.coalesce(paid.c.amount, 0)
+    ).outerjoin(paid, paid.c.loan_id == expected.c.loan_id)
+    if loan_ids is not None:
+        query = query.where(expected.c.loan_id.in_(loan_ids))
+
+    return [
+        {
+            'loan_id': loan_id,
+            'expected': float(due),
+            'paid': float(received),
+            'shortfall': max(0.0, float(due) - float(received)),
+        }
+        for loan_id, due, received in db.session.execute(query)
+    ]
+
+
+@click.command('generate-schedules')
+@click.option('--loan-id', 'loan_ids', type=int, multiple=True, help='Only these loans (repeatable).')
+@click.option('--batch-size', default=2000, show_default=True, help='Loans per transaction.')
+@with_appcontext
+def generate_schedules_command(loan_ids, batch_size):
+    """Build expected repayment schedules for approved loans."""
+    started = time.perf_counter()
+    loans, instalments = generate_schedules(loan_ids=list(loan_ids) or None, batch_size=batch_size)
+    click.echo(f'Scheduled {loans} loans ({instalments} instalments) in {time.perf_counter() - started:.1f}s.')
+
+
+def init_schedules(app):
+    """Register the schedule generation command."""
+    app.cli.add_command(generate_schedules_command)
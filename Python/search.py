@@ -0,0 +1,146 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, literal_column, or_, table, column, text
+from extensions import db
+from models import Borrower
+
+SEARCH_COLUMNS = ('full_name', 'email', 'phone', 'employer_name')
+
+# Trigram indexes and FTS5's trigram tokenizer need at least three characters
+MIN_INDEXED_LENGTH = 3
+
+# Postgres: one GIN trigram index over the concatenated searchable columns.
+# Queries must use exactly this expression for the planner to pick the index.
+PG_DOCUMENT = " || ' ' || ".join(f"coalesce({name}, '')" for name in SEARCH_COLUMNS)
+PG_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX {{concurrently}} IF NOT EXISTS ix_borrowers_search_trgm "
+    f"ON borrowers USING gin (({PG_DOCUMENT}) gin_trgm_ops)",
+]
+
+# SQLite: an external-content FTS5 table kept in sync by triggers
+_FTS_COLUMNS = ', '.join(SEARCH_COLUMNS)
+_FTS_NEW = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+_FTS_OLD = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+SQLITE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS borrowers_fts USING fts5("
+    f"{_FTS_COLUMNS}, content='borrowers', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS borrowers_fts_ai AFTER INSERT ON borrowers BEGIN "
+    f"INSERT INTO borrowers_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW}); END",
+    f"CREATE TRIGGER IF NOT EXISTS borrowers_fts_ad AFTER DELETE ON borrowers BEGIN "
+    f"INSERT INTO borrowers_fts(borrowers_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD}); END",
+    f"CREATE TRIGGER IF NOT EXISTS borrowers_fts_au AFTER UPDATE ON borrowers BEGIN "
+    f"INSERT INTO borrowers_fts(borrowers_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD}); "
+    f"INSERT INTO borrowers_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW}); END",
+]
+
+borrowers_fts = table('borrowers_fts', column('rowid'))
+
+# Looks up the index object that the indexed path of each dialect depends on
+INDEX_EXISTS = {
+    'postgresql': "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_borrowers_search_trgm'",
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'borrowers_fts'",
+}
+
+# Engine URLs whose search index has been seen; a missing index is looked up again on the next search
+_indexed_engines = set()
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fallback_search(query, term):
+    """Unindexed substring match, used for short terms and when the search index is unavailable."""
+    pattern = _like_pattern(term)
+    return query.filter(or_(*[
+        getattr(Borrower, name).ilike(pattern, escape='\\')
+        for name in SEARCH_COLUMNS
+    ]))
+
+
+def _has_search_index(dialect):
+    """Whether the bound database has the search index (it is created by a migration)."""
+    bind = db.session.get_bind()
+    key = str(bind.url)
+    if key not in _indexed_engines:
+        if db.session.execute(text(INDEX_EXISTS[dialect])).scalar() is None:
+            return False
+        _indexed_engines.add(key)
+    return True
+
+
+def search_borrowers(query, term):
+    """Filter a Borrower query by `term` and order it by relevance.
+
+    Postgres uses the pg_trgm GIN index and ranks by word similarity; SQLite uses
+    the FTS5 trigram table and ranks by bm25. Terms shorter than three characters,
+    databases without the index and other databases fall back to an ILIKE scan.
+    """
+    term = term.strip()
+    if not term:
+        return query
+
+    if len(term) < MIN_INDEXED_LENGTH:
+        return _fallback_search(query, term)
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in INDEX_EXISTS or not _has_search_index(dialect):
+        return _fallback_search(query, term)
+
+    if dialect == 'postgresql':
+        document = literal_column(f'({PG_DOCUMENT})')
+        return query\
+            .filter(document.ilike(_like_pattern(term), escape='\\'))\
+            .order_by(func.word_similarity(term, document).desc(), Borrower.id)
+
+    phrase = '"' + term.replace('"', '""') + '"'
+    return query\
+        .join(borrowers_fts, borrowers_fts.c.rowid == Borrower.id)\
+        .filter(text('borrowers_fts MATCH :search_phrase').bindparams(search_phrase=phrase))\
+        .order_by(text('bm25(borrowers_fts)'), Borrower.id)
+
+
+def ensure_search_index(concurrently=False):
+    """Create the search index objects for the bound database if they are missing."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        # CONCURRENTLY cannot run inside a transaction block
+        options = {'isolation_level': 'AUTOCOMMIT'} if concurrently else {}
+        with db.engine.connect().execution_options(**options) as connection:
+            for statement in PG_STATEMENTS:
+                connection.execute(text(statement.format(concurrently='CONCURRENTLY' if concurrently else '')))
+            connection.commit()
+    elif dialect == 'sqlite':
+        with db.engine.begin() as connection:
+            for statement in SQLITE_STATEMENTS:
+                connection.execute(text(statement))
+            connection.execute(text("INSERT INTO borrowers_fts(borrowers_fts) VALUES ('rebuild')"))
+
+
+@click.command('init-borrower-search')
+@with_appcontext
+def init_borrower_search_command():
+    """Create (and on SQLite rebuild) the borrower search index."""
+    ensure_search_index(concurrently=True)
+    click.echo(f'Borrower search index ready on {db.engine.dialect.name}.')
+
+
+def _after_create(target, connection, **kw):
+    if connection.dialect.name == 'postgresql':
+        statements = [statement.format(concurrently='') for statement in PG_STATEMENTS]
+    elif connection.dialect.name == 'sqlite':
+        statements = SQLITE_STATEMENTS
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def init_borrower_search(app):
+    """Create search index objects alongside the borrowers table and register the CLI command."""
+    borrowers = Borrower.__table__
+    if not event.contains(borrowers, 'after_create', _after_create):
+        event.listen(borrowers, 'after_create', _after_create)
+    app.cli.add_command(init_borrower_search_command)
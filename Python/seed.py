@@ -0,0 +1,240 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import func, text
+from werkzeug.security import generate_password_hash
+from bulk import bulk_insert
+from extensions import db
+from models import User, Borrower, Loan, RepaymentRecord, Document
+from portfolio import reconcile_summary
+from purposes import classify_purpose
+
+PURPOSES = [
+    'School fees for term 1', 'Medical bills', 'Family vacation', 'Funeral expenses',
+    'Customary obligations', 'Home repairs', 'Car repairs', 'Household goods',
+]
+LOAN_STATUSES = (['approved', 'pending', 'rejected'], [0.7, 0.2, 0.1])
+OCR_STATUSES = (['completed', 'pending', 'failed'], [0.85, 0.1, 0.05])
+FREQUENCIES = ['fortnightly', 'weekly', 'monthly']
+HISTORY_DAYS = 730
+
+
+class Seeder:
+    """Bulk-generate related users, borrowers, loans, repayments and documents.
+
+    Text that needs to look real (names, employers) comes from Faker; everything
+    else is drawn as NumPy vectors per batch so tens of millions of rows stay cheap.
+    Ids are assigned up front from the current maximum so child rows can reference
+    parents without reading them back.
+    """
+
+    def __init__(self, batch_size=50000, seed=None):
+        # Imported here so other CLI commands do not pay for Faker's providers
+        from faker import Faker
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.fake = Faker()
+        if seed is not None:
+            Faker.seed(seed)
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    def _next_id(self, model):
+        return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+    def _timestamps(self, n, days=HISTORY_DAYS):
+        seconds = self.rng.integers(0, days * 86400, n)
+        return [self.now - timedelta(seconds=int(s)) for s in seconds]
+
+    def _insert(self, model, make_rows, total):
+        """Insert `total` rows produced batch by batch by make_rows(first_id, n)."""
+        first_id = self._next_id(model)
+        for offset in range(0, total, self.batch_size):
+            n = min(self.batch_size, total - offset)
+            bulk_insert(model.__table__, make_rows(first_id + offset, n))
+            db.session.commit()
+        return first_id
+
+    def users_and_borrowers(self, count):
+        """Create `count` borrower accounts with their borrower profiles. Returns (first user id, first borrower id)."""
+        password_hash = generate_password_hash('password1234')
+        first_user = self._next_id(User)
+
+        def users(first_id, n):
+            created = self._timestamps(n)
+            return [
+                {
+                    'id': first_id + i,
+                    'username': f"{self.fake.user_name()}{first_id + i}",
+                    'email': f"user{first_id + i}@example.com",
+                    'password_hash': password_hash,
+                    'role': 'borrower',
+                    'created_at': created[i],
+                }
+                for i in range(n)
+            ]
+
+        def borrowers(first_id, n):
+            user_offset = first_id - first_borrower
+            income = np.round(self.rng.uniform(800, 9000, n), 2)
+            created = self._timestamps(n)
+            return [
+                {
+                    'id': first_id + i,
+                    'user_id': first_user + user_offset + i,
+                    'full_name': self.fake.name(),
+                    'email': f"user{first_user + user_offset + i}@example.com",
+                    'phone': self.fake.numerify('7#######'),
+                    'city': self.fake.city(),
+                    'employer_name': self.fake.company(),
+                    'employment_status': 'employed',
+                    'monthly_income': float(income[i]),
+                    'status': 'active',
+                    'created_at': created[i],
+                    'updated_at': created[i],
+                }
+                for i in range(n)
+            ]
+
+        self._insert(User, users, count)
+        first_borrower = self._next_id(Borrower)
+        self._insert(Borrower, borrowers, count)
+        return first_user, first_borrower
+
+    def loans(self, count, first_borrower, borrowers):
+        """Create `count` loans spread over the given borrower id range. Returns the first loan id."""
+        categories = {purpose: classify_purpose(purpose) for purpose in PURPOSES}
+
+        def rows(first_id, n):
+            borrower_ids = self.rng.integers(first_borrower, first_borrower + borrowers, n)
+            amounts = np.round(self.rng.uniform(200, 20000, n), 2)
+            terms = self.rng.integers(10, 53, n)
+            rates = np.round(self.rng.uniform(10, 30, n), 2)
+            statuses = self.rng.choice(LOAN_STATUSES[0], n, p=LOAN_STATUSES[1])
+            purposes = self.rng.choice(PURPOSES, n)
+            frequencies = self.rng.choice(FREQUENCIES, n, p=[0.7, 0.2, 0.1])
+            created = self._timestamps(n)
+            return [
+                {
+                    'id': first_id + i,
+                    'borrower_id': int(borrower_ids[i]),
+                    'amount': float(amounts[i]),
+                    'term': int(terms[i]),
+                    'interest_rate': float(rates[i]),
+                    'repayment_frequency': str(frequencies[i]),
+                    'approved_by': None,
+                    'approved_at': created[i] + timedelta(days=2) if statuses[i] == 'approved' else None,
+                    'created_at': created[i],
+                    'status': str(statuses[i]),
+                    'purpose': str(purposes[i]),
+                    'purpose_category': categories[purposes[i]],
+                }
+                for i in range(n)
+            ]
+
+        return self._insert(Loan, rows, count)
+
+    def repayments(self, count, first_loan, loans):
+        """Create `count` repayment records spread over the given loan id range."""
+        def rows(first_id, n):
+            loan_ids = self.rng.integers(first_loan, first_loan + loans, n)
+            amounts = np.round(self.rng.uniform(20, 800, n), 2)
+            late_days = self.rng.integers(1, 30, n)
+            late = self.rng.random(n) < 0.15
+            paid = self._timestamps(n)
+            return [
+                {
+                    'id': first_id + i,
+                    'loan_id': int(loan_ids[i]),
+                    'amount': float(amounts[i]),
+                    'payment_date': paid[i],
+                    'due_date': paid[i] - timedelta(days=int(late_days[i])) if late[i] else paid[i],
+                    'is_late_payment': bool(late[i]),
+                    'created_at': paid[i],
+                }
+                for i in range(n)
+            ]
+
+        self._insert(RepaymentRecord, rows, count)
+
+    def documents(self, count, first_user, users, first_loan, loans):
+        """Create `count` application documents linked to seeded users and loans."""
+        def rows(first_id, n):
+            user_ids = self.rng.integers(first_user, first_user + users, n)
+            loan_ids = self.rng.integers(first_loan, first_loan + loans, n) if loans else [None] * n
+            statuses = self.rng.choice(OCR_STATUSES[0], n, p=OCR_STATUSES[1])
+            confidence = np.round(self.rng.uniform(0.6, 0.99, n), 3)
+            processing = self.rng.exponential(3.0, n)
+            created = self._timestamps(n)
+            return [
+                {
+                    'id': first_id + i,
+                    'user_id': int(user_ids[i]),
+                    'loan_id': int(loan_ids[i]) if loans else None,
+                    'document_type': 'loan_application',
+                    'file_name': f"application_{first_id + i}.pdf",
+                    'file_path': f"uploads/application_{first_id + i}.pdf",
+                    'ocr_status': str(statuses[i]),
+                    'ocr_confidence_score': float(confidence[i]) if statuses[i] == 'completed' else None,
+                    'created_at': created[i],
+                    'uploaded_at': created[i] + timedelta(seconds=float(processing[i]))
+                    if statuses[i] == 'completed' else None,
+                }
+                for i in range(n)
+            ]
+
+        self._insert(Document, rows, count)
+
+    def sync_sequences(self):
+        """Move Postgres id sequences past the explicitly assigned ids."""
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return
+        for model in (User, Borrower, Loan, RepaymentRecord, Document):
+            table = model.__tablename__
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+            ))
+        db.session.commit()
+
+    def run(self, users, loans, repayments, documents, echo=print):
+        started = time.perf_counter()
+        first_user, first_borrower = self.users_and_borrowers(users)
+        echo(f'{users} users/borrowers ({time.perf_counter() - started:.1f}s)')
+
+        first_loan = self.loans(loans, first_borrower, users) if users else None
+        echo(f'{loans} loans ({time.perf_counter() - started:.1f}s)')
+
+        if loans and first_loan is not None:
+            self.repayments(repayments, first_loan, loans)
+            echo(f'{repayments} repayments ({time.perf_counter() - started:.1f}s)')
+        if users:
+            self.documents(documents, first_user, users, first_loan, loans)
+            echo(f'{documents} documents ({time.perf_counter() - started:.1f}s)')
+
+        self.sync_sequences()
+        # Bulk inserts bypass the session events that maintain the summary row
+        reconcile_summary()
+        echo(f'Portfolio summary rebuilt ({time.perf_counter() - started:.1f}s)')
+
+
+@click.command('seed-data')
+@click.option('--users', default=1000, show_default=True, help='Users, each with a borrower profile.')
+@click.option('--loans', default=5000, show_default=True)
+@click.option('--repayments', default=50000, show_default=True)
+@click.option('--documents', default=2000, show_default=True)
+@click.option('--batch-size', default=50000, show_default=True, help='Rows per bulk insert.')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible data.')
+@with_appcontext
+def seed_data_command(users, loans, repayments, documents, batch_size, seed):
+    """Bulk-generate synthetic data at the given volumes (e.g. --users 100000 --loans 1000000)."""
+    if loans and not users:
+        raise click.UsageError('--loans needs --users greater than 0: every loan belongs to a seeded borrower.')
+    Seeder(batch_size=batch_size, seed=seed).run(users, loans, repayments, documents, echo=click.echo)
+
+
+def init_seed(app):
+    """Register the synthetic data command."""
+    app.cli.add_command(seed_data_command)
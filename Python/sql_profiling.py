@@ -0,0 +1,99 @@
+import re
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement, max_length=500):
+    """Reduce a statement to its shape: literals and placeholders become ?, IN lists collapse."""
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?...)', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return sql if len(sql) <= max_length else sql[:max_length] + '...'
+
+
+class RequestProfile:
+    """SQL statistics gathered for one request."""
+
+    __slots__ = ('started', 'count', 'db_time', 'slowest_time', 'slowest_statement')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+def _current_profile():
+    return g.get('sql_profile') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    started = conn.info.pop('query_started', None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+def _start_profile():
+    g.sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    db_ms = profile.db_time * 1000
+    slowest_ms = profile.slowest_time * 1000
+    config = current_app.config
+
+    if config['SERVER_TIMING_ENABLED']:
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{profile.count} queries", app;dur={total_ms - db_ms:.1f}'
+        )
+
+    if total_ms >= config['SLOW_REQUEST_THRESHOLD_MS'] or slowest_ms >= config['SLOW_QUERY_THRESHOLD_MS']:
+        slowest = normalize_sql(profile.slowest_statement) if profile.slowest_statement else '-'
+        current_app.logger.warning(
+            f"Slow request {request.method} {request.endpoint}: {total_ms:.1f}ms total, "
+            f"{profile.count} queries in {db_ms:.1f}ms, slowest {slowest_ms:.1f}ms: {slowest}"
+        )
+    return response
+
+
+def init_sql_profiling(app):
+    """Profile the SQL issued by each request when SQL_PROFILING_ENABLED is set."""
+    if not app.config.get('SQL_PROFILING_ENABLED'):
+        return
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
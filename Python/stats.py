@@ -0,0 +1,403 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, extract, select, true
+from extensions import db, stats_cache
+from models import Loan, RepaymentRecord, Document
+from portfolio import get_summary
+from purposes import category_distribution
+
+def _count_if(condition):
+    """Conditional COUNT that works on both Postgres and SQLite."""
+    return func.sum(case((condition, 1), else_=0))
+
+
+def _rate(part, total):
+    return (part / total * 100) if total > 0 else 0
+
+
+def _month_windows(months):
+    """Return (label, start, end) tuples for the last `months` calendar months, oldest first."""
+    current = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    windows = []
+    for i in range(months - 1, -1, -1):
+        start = current - relativedelta(months=i)
+        windows.append((start.strftime('%B'), start, start + relativedelta(months=1)))
+    return windows
+
+
+def _run(*blocks):
+    """Execute several single-row aggregate blocks as one statement.
+
+    Each block is a (columns, parse) pair, optionally followed by WHERE conditions
+    that restrict the rows its aggregates read. The blocks are wrapped in subqueries
+    and cross-joined, so the database returns one row and the app pays one round trip.
+    """
+    if not blocks:
+        return {}
+
+    subqueries = [select(*columns).where(*where).subquery() for columns, _, *where in blocks]
+    joined = subqueries[0]
+    for subquery in subqueries[1:]:
+        joined = joined.join(subquery, true())
+    row = db.session.execute(select(*subqueries).select_from(joined)).one()
+
+    result = {}
+    offset = 0
+    for columns, parse, *_ in blocks:
+        result.update(parse(row[offset:offset + len(columns)]))
+        offset += len(columns)
+    return result
+
+
+def _loan_totals_block():
+    """Loan counts and the approved portfolio total."""
+    approved = Loan.status == 'approved'
+    columns = [
+        func.count(Loan.id),
+        _count_if(approved),
+        func.sum(case((approved, Loan.amount), else_=0)),
+        _count_if(Loan.status == 'pending'),
+    ]
+
+    def parse(values):
+        total_loans, active_loans, total_disbursed, pending_applications = values
+        return _loan_totals(total_loans, active_loans, total_disbursed, pending_applications)
+
+    return columns, parse
+
+
+def _loan_totals(total_loans, active_loans, total_disbursed, pending_applications):
+    total_disbursed = float(total_disbursed or 0)
+    active_loans = int(active_loans or 0)
+    return {
+        'total_loans': int(total_loans or 0),
+        'active_loans': active_loans,
+        'total_disbursed': total_disbursed,
+        'avg_loan_amount': total_disbursed / active_loans if active_loans > 0 else 0,
+        'pending_applications': int(pending_applications or 0),
+    }
+
+
+def _trend_block(months=6):
+    """Amount lent per calendar month, reading only loans inside the windows (ix_loans_created_at_id)."""
+    windows = _month_windows(months)
+    columns = [
+        func.sum(case(((Loan.created_at >= start) & (Loan.created_at < end), Loan.amount), else_=0))
+        for _, start, end in windows
+    ]
+
+    def parse(values):
+        return {
+            'monthly_labels': [label for label, _, _ in windows],
+            'monthly_amounts': [float(amount or 0) for amount in values],
+        }
+
+    return columns, parse, Loan.created_at >= windows[0][1], Loan.created_at < windows[-1][2]
+
+
+def _repayment_block():
+    """Repayment counts and on-time/late rates."""
+    columns = [
+        func.count(),
+        _count_if(RepaymentRecord.is_late_payment.is_(False)),
+        _count_if(RepaymentRecord.is_late_payment.is_(True)),
+    ]
+
+    def parse(values):
+        return _repayment_totals(*values)
+
+    return columns, parse
+
+
+def _repayment_totals(total, ontime, late):
+    total, ontime, late = int(total or 0), int(ontime or 0), int(late or 0)
+    return {
+        'total_repayments': total,
+        'ontime_payment_rate': _rate(ontime, total),
+        'late_payment_rate': _rate(late, total),
+    }
+
+
+def _summary_totals(summary):
+    """Loan and repayment totals read from the maintained portfolio_summary row."""
+    return {
+        'portfolio_totals': _loan_totals(
+            summary.total_loans,
+            summary.active_loans,
+            summary.total_disbursed,
+            summary.pending_applications,
+        ),
+        'repayment_rates': _repayment_totals(
+            summary.total_repayments,
+            summary.ontime_repayments,
+            summary.late_repayments,
+        ),
+    }
+
+
+def _document_block():
+    """OCR document counts, success rate and average confidence."""
+    columns = [
+        func.count(),
+        _count_if(Document.ocr_status == 'completed'),
+        func.avg(Document.ocr_confidence_score),
+    ]
+
+    def parse(values):
+        total, completed, avg_confidence = values
+        total = int(total or 0)
+        return {
+            'documents_processed': total,
+            'avg_ocr_confidence': float(avg_confidence or 0) * 100,
+            'ocr_success_rate': _rate(int(completed or 0), total),
+        }
+
+    return columns, parse
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def _processing_seconds():
+    """Seconds between a document's creation and upload, as a SQL expression."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return extract('epoch', Document.uploaded_at - Document.created_at)
+    return (func.julianday(Document.uploaded_at) - func.julianday(Document.created_at)) * 86400
+
+
+def _bucket_labels(edges):
+    labels = [f"<{edges[0]:g}s"]
+    labels += [f"{low:g}-{high:g}s" for low, high in zip(edges, edges[1:])]
+    labels.append(f">{edges[-1]:g}s")
+    return labels
+
+
+def _processing_time_block(edges):
+    """Histogram of completed-document processing times over the configured bucket edges.
+
+    On Postgres the p50/p95/p99 come from percentile_cont in the same statement.
+    """
+    seconds = _processing_seconds()
+    completed = (Document.ocr_status == 'completed') & seconds.isnot(None)
+    bounds = [None] + list(edges) + [None]
+
+    columns = []
+    for low, high in zip(bounds, bounds[1:]):
+        condition = completed
+        if low is not None:
+            condition = condition & (seconds >= low)
+        if high is not None:
+            condition = condition & (seconds < high)
+        columns.append(_count_if(condition))
+
+    with_percentiles = db.session.get_bind().dialect.name == 'postgresql'
+    if with_percentiles:
+        columns += [
+            func.percentile_cont(p / 100).within_group(seconds).filter(completed)
+            for p in PERCENTILES
+        ]
+
+    def parse(values):
+        counts = [int(count or 0) for count in values[:len(bounds) - 1]]
+        data = {
+            'processing_time_labels': _bucket_labels(edges),
+            'processing_time_distribution': counts,
+        }
+        if with_percentiles:
+            data['processing_time_percentiles'] = {
+                f'p{p}': float(value or 0) for p, value in zip(PERCENTILES, values[len(counts):])
+            }
+        else:
+            data['processing_time_percentiles'] = _nearest_rank_percentiles(seconds, completed, sum(counts))
+        return data
+
+    return columns, parse
+
+
+def _nearest_rank_percentiles(seconds, completed, total):
+    """Percentiles for databases without percentile_cont: one ORDER BY/OFFSET lookup each."""
+    percentiles = {}
+    for p in PERCENTILES:
+        value = None
+        if total:
+            offset = max(0, -(-p * total // 100) - 1)
+            value = db.session.query(seconds)\
+                .filter(completed)\
+                .order_by(seconds)\
+                .offset(offset)\
+                .limit(1)\
+                .scalar()
+        percentiles[f'p{p}'] = float(value or 0)
+    return percentiles
+
+
+# Cached stats blocks and the models whose commits make them stale
+BLOCKS = ('portfolio_totals', 'repayment_rates', 'monthly_trend', 'type_distribution', 'document_stats')
+INVALIDATED_BY = {
+    Loan: ('portfolio_totals', 'monthly_trend', 'type_distribution'),
+    RepaymentRecord: ('repayment_rates',),
+    Document: ('document_stats',),
+}
+
+
+def _document_stats_block():
+    """Document counts plus the processing-time histogram, parsed as one block."""
+    document_columns, parse_documents = _document_block()
+    time_columns, parse_times = _processing_time_block(current_app.config['OCR_PROCESSING_TIME_BUCKETS'])
+    split = len(document_columns)
+
+    def parse(values):
+        data = parse_documents(values[:split])
+        data.update(parse_times(values[split:]))
+        return data
+
+    return document_columns + time_columns, parse
+
+
+def _named(name, block):
+    """Wrap a block so its parsed values are nested under `name`."""
+    columns, parse, *where = block
+    return (columns, lambda values: {name: parse(values)}, *where)
+
+
+def compute_blocks(names):
+    """Compute the named stats blocks, batching every aggregate into one statement.
+
+    Loan and repayment totals come from the portfolio summary row when it exists and
+    the loan type distribution from the indexed purpose_category column.
+
+    Returns:
+        dict mapping each block name to its dict of values
+    """
+    names = set(names)
+    results = {}
+    builders = {
+        'monthly_trend': _trend_block,
+        'document_stats': _document_stats_block,
+    }
+
+    if names & {'portfolio_totals', 'repayment_rates'}:
+        summary = get_summary()
+        if summary:
+            totals = _summary_totals(summary)
+            results.update({name: totals[name] for name in totals if name in names})
+        else:
+            builders['portfolio_totals'] = _loan_totals_block
+            builders['repayment_rates'] = _repayment_block
+
+    pending = [name for name in builders if name in names and name not in results]
+    results.update(_run(*[_named(name, builders[name]()) for name in pending]))
+
+    if 'type_distribution' in names:
+        labels, counts = category_distribution()
+        results['type_distribution'] = {'loan_types': labels, 'loan_type_distribution': counts}
+
+    return results
+
+
+def load_stats(*names):
+    """Read the named blocks through the stats cache and merge them into one dict."""
+    blocks = stats_cache.get_or_compute_many(names, compute_blocks)
+    data = {}
+    for name in names:
+        data.update(blocks[name])
+    return data
+
+
+def dashboard_stats():
+    """Template context for the admin dashboard."""
+    data = load_stats('portfolio_totals', 'type_distribution')
+    return {
+        'stats': {
+            'active_loans': data['active_loans'],
+            'total_disbursed': data['total_disbursed'],
+            'pending_applications': data['pending_applications'],
+        },
+        'loan_types': data['loan_types'],
+        'loan_distribution': data['loan_type_distribution'],
+    }
+
+
+def _analytics_context(data):
+    stats = {
+        'active_loans': data['active_loans'],
+        'avg_loan_amount': data['avg_loan_amount'],
+        'total_portfolio': data['total_disbursed'],
+        'total_repayments': data['total_repayments'],
+        'ontime_payment_rate': data['ontime_payment_rate'],
+        'late_payment_rate': data['late_payment_rate'],
+    }
+    return {
+        'stats': stats,
+        'monthly_labels': data['monthly_labels'],
+        'monthly_amounts': data['monthly_amounts'],
+        'loan_types': data['loan_types'],
+        'loan_type_distribution': data['loan_type_distribution'],
+    }
+
+
+ANALYTICS_BLOCKS = ('portfolio_totals', 'repayment_rates', 'monthly_trend', 'type_distribution')
+
+
+def analytics_stats():
+    """Template context for the analytics blueprint dashboard."""
+    return _analytics_context(load_stats(*ANALYTICS_BLOCKS))
+
+
+def admin_analytics_stats():
+    """Template context for the admin analytics dashboard."""
+    data = load_stats(*ANALYTICS_BLOCKS, 'document_stats')
+    context = _analytics_context(data)
+    context['stats'].update({
+        'documents_processed': data['documents_processed'],
+        'avg_ocr_confidence': data['avg_ocr_confidence'],
+        'ocr_success_rate': data['ocr_success_rate'],
+    })
+    context['stats'].update(data['processing_time_percentiles'])
+    context['processing_time_labels'] = data['processing_time_labels']
+    context['processing_time_distribution'] = data['processing_time_distribution']
+    return context
+
+
+def _record_changes(session, flush_context):
+    """Remember which tracked models this transaction wrote."""
+    touched = session.info.setdefault('stats_touched', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) in INVALIDATED_BY:
+            touched.add(type(obj))
+
+
+def _invalidate_touched(session):
+    touched = session.info.pop('stats_touched', None)
+    if touched:
+        stats_cache.invalidate(*{name for model in touched for name in INVALIDATED_BY[model]})
+
+
+def _forget_changes(session):
+    session.info.pop('stats_touched', None)
+
+
+@click.command('stats-cache')
+@click.option('--clear', is_flag=True, help='Drop every cached block.')
+@with_appcontext
+def stats_cache_command(clear):
+    """Show stats cache hit/miss counters, optionally clearing it."""
+    if clear:
+        stats_cache.invalidate(*BLOCKS)
+        click.echo('Stats cache cleared.')
+    for key, value in stats_cache.stats().items():
+        click.echo(f'{key}: {value}')
+
+
+def init_stats_cache(app):
+    """Configure the stats cache and invalidate blocks when their tables change."""
+    stats_cache.init_app(app)
+    for name, listener in (('after_flush', _record_changes),
+                           ('after_commit', _invalidate_touched),
+                           ('after_rollback', _forget_changes)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+    app.cli.add_command(stats_cache_command)
@@ -0,0 +1,353 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.utils import secure_filename
+from extensions import db
+from models import Document, UploadSession
+
+CHUNK_SIZE = 1024 * 1024
+
+StoredFile = namedtuple('StoredFile', 'digest size path created')
+ChunkClaim = namedtuple('ChunkClaim', 'upload_id offset total_size temp_path locked_at')
+
+
+class UploadError(Exception):
+    """Raised when a resumable upload cannot accept a chunk or be finalized."""
+
+
+def allowed_file(filename):
+    """True when `filename` has one of the ALLOWED_EXTENSIONS."""
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    return extension in current_app.config['ALLOWED_EXTENSIONS']
+
+
+class ContentStore:
+    """Blobs stored once by SHA-256 under <root>/<ab>/<cd>/<digest>.
+
+    Uploads are streamed to a temp file inside the store (same filesystem) while
+    being hashed, then renamed into place, so a blob path either does not exist or
+    holds the complete content. A blob that is already present is not written again;
+    every Document with the same content points at the one file.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def temp_file(self):
+        """Open a new temp file in the store; returns (file object, path)."""
+        temp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=temp_dir)
+        return os.fdopen(fd, 'wb'), path
+
+    def commit(self, temp_path, digest, size):
+        """Move a fully written temp file to its content address (or drop it if already stored)."""
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            os.unlink(temp_path)
+            return StoredFile(digest, size, path, False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return StoredFile(digest, size, path, True)
+
+    def temp_files(self):
+        """Yield the paths of temp files currently in the store."""
+        temp_dir = os.path.join(self.root, 'tmp')
+        if os.path.isdir(temp_dir):
+            for name in os.listdir(temp_dir):
+                yield os.path.join(temp_dir, name)
+
+    def save(self, stream, chunk_size=CHUNK_SIZE):
+        """Stream `stream` into the store in chunks while hashing it. Returns a StoredFile."""
+        sha256 = hashlib.sha256()
+        size = 0
+        out, temp_path = self.temp_file()
+        try:
+            with out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            return self.commit(temp_path, sha256.hexdigest(), size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+
+def content_store():
+    return ContentStore(current_app.config['UPLOAD_STORE_FOLDER'])
+
+
+def document_for(stored, filename, document_type, **fields):
+    """Build a Document row referencing a stored blob (added to the session, not committed)."""
+    document = Document(
+        document_type=document_type,
+        file_name=secure_filename(filename),
+        file_path=stored.path,
+        content_hash=stored.digest,
+        file_size=stored.size,
+        ocr_status='pending',
+        uploaded_at=datetime.utcnow(),
+        **fields
+    )
+    db.session.add(document)
+    return document
+
+
+def store_upload(file, document_type, **fields):
+    """Store an uploaded werkzeug FileStorage and add its Document row to the session."""
+    stored = content_store().save(file.stream)
+    if not stored.created:
+        current_app.logger.info(f"Upload {file.filename} deduplicated to {stored.digest}")
+    return document_for(stored, file.filename, document_type, **fields)
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """Return (SHA-256 hex digest, size) of the file at `path`, read in chunks."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+def start_upload(filename, size, document_type, user_id=None, expected_hash=None):
+    """Create a resumable upload session and its empty temp file (added to the session, not committed)."""
+    out, temp_path = content_store().temp_file()
+    out.close()
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        document_type=document_type,
+        file_name=secure_filename(filename),
+        total_size=size,
+        received=0,
+        temp_path=temp_path,
+        expected_hash=expected_hash.lower() if expected_hash else None
+    )
+    db.session.add(upload)
+    return upload
+
+
+def claim_chunk(upload, offset):
+    """Mark `upload` as being written at `offset` and commit, so no other request writes it concurrently.
+
+    Like the OCR and email queues this is a conditional UPDATE: it only matches while
+    `offset` is the next expected byte and no other chunk holds the upload (or that
+    chunk has been stuck longer than UPLOAD_CHUNK_TIMEOUT). Everything write_chunk
+    needs is copied into the returned ChunkClaim before the commit, so the expired
+    `upload` is not reloaded (and no pooled connection checked out) while the body
+    is read.
+
+    Returns:
+        A ChunkClaim; None if the offset is stale or another chunk is in progress
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['UPLOAD_CHUNK_TIMEOUT'])
+    claim = ChunkClaim(upload.id, offset, upload.total_size, upload.temp_path, now)
+    claimed = UploadSession.query\
+        .filter(
+            UploadSession.id == claim.upload_id,
+            UploadSession.status == 'receiving',
+            UploadSession.received == offset,
+            db.or_(UploadSession.locked_at.is_(None), UploadSession.locked_at < stale)
+        )\
+        .update({UploadSession.locked_at: now}, synchronize_session=False)
+    db.session.commit()
+    return claim if claimed else None
+
+
+def write_chunk(claim, stream, chunk_size=CHUNK_SIZE):
+    """Write `stream` into the claimed upload's temp file and advance `received`.
+
+    The body is copied to disk `chunk_size` bytes at a time and never held in memory
+    whole. The database is only touched once the body has been read: a conditional
+    UPDATE records the new offset and releases the claim, unless the claim timed out
+    and another request took the upload over. If the client disconnects part way,
+    the bytes that reached the file are kept and `received` says where to resume.
+
+    Returns:
+        The new offset
+    """
+    received = claim.offset
+    remaining = claim.total_size - claim.offset
+    try:
+        with open(claim.temp_path, 'r+b') as out:
+            # Drop anything past the offset left by an earlier interrupted chunk
+            out.seek(claim.offset)
+            out.truncate()
+            try:
+                while remaining > 0:
+                    chunk = stream.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    remaining -= len(chunk)
+            finally:
+                out.flush()
+                os.fsync(out.fileno())
+                received = out.tell()
+    finally:
+        released = UploadSession.query\
+            .filter(
+                UploadSession.id == claim.upload_id,
+                UploadSession.received == claim.offset,
+                UploadSession.locked_at == claim.locked_at
+            )\
+            .update({UploadSession.received: received, UploadSession.locked_at: None}, synchronize_session=False)
+        db.session.commit()
+        if not released:
+            current_app.logger.warning(f"Upload {claim.upload_id} chunk at {claim.offset} lost its claim")
+    return received
+
+
+def finalize_upload(upload):
+    """Move a fully received upload into the content store and add its Document row (not committed).
+
+    Raises:
+        UploadError: Bytes are missing or the content does not match the client's SHA-256
+    """
+    if upload.received != upload.total_size:
+        raise UploadError(f'Upload incomplete: {upload.received} of {upload.total_size} bytes received')
+
+    digest, size = hash_file(upload.temp_path)
+    if size != upload.total_size:
+        raise UploadError(f'Upload file holds {size} bytes, expected {upload.total_size}')
+    if upload.expected_hash and digest != upload.expected_hash:
+        raise UploadError('Upload content does not match the declared sha256')
+
+    stored = content_store().commit(upload.temp_path, digest, size)
+    document = document_for(stored, upload.file_name, upload.document_type, user_id=upload.user_id)
+    upload.document = document
+    upload.status = 'completed'
+    return document
+
+
+def expire_stale_uploads(ttl=None):
+    """Delete upload sessions idle for longer than `ttl` seconds and orphaned temp files.
+
+    Receiving sessions lose their partial file; completed sessions only their row (the
+    Document keeps the blob). Temp files in the store that no live session references,
+    e.g. left by a crashed save(), are removed once they are older than `ttl` too.
+
+    Returns:
+        (sessions deleted, temp files removed, bytes reclaimed)
+    """
+    ttl = current_app.config['UPLOAD_SESSION_TTL'] if ttl is None else ttl
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    files = reclaimed = 0
+
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        if upload.status == 'receiving' and os.path.exists(upload.temp_path):
+            reclaimed += os.path.getsize(upload.temp_path)
+            os.unlink(upload.temp_path)
+            files += 1
+        db.session.delete(upload)
+    db.session.commit()
+
+    live = {path for (path,) in db.session.query(UploadSession.temp_path).filter_by(status='receiving')}
+    for path in content_store().temp_files():
+        if path not in live and os.path.getmtime(path) < time.time() - ttl:
+            reclaimed += os.path.getsize(path)
+            os.unlink(path)
+            files += 1
+    return len(stale), files, reclaimed
+
+
+def migrate_legacy_uploads(batch_size=500):
+    """Move files of documents saved before the content store into it.
+
+    Returns:
+        (documents updated, bytes reclaimed by deduplication, documents whose file is missing)
+    """
+    store = content_store()
+    updated = reclaimed = missing = 0
+    last_id = 0
+    while True:
+        documents = Document.query\
+            .filter(Document.content_hash.is_(None), Document.id > last_id)\
+            .order_by(Document.id)\
+            .limit(batch_size)\
+            .all()
+        if not documents:
+            break
+        last_id = documents[-1].id
+
+        legacy_paths = set()
+        for document in documents:
+            legacy_path = document.file_path
+            if not os.path.isfile(legacy_path):
+                missing += 1
+                continue
+            with open(legacy_path, 'rb') as f:
+                stored = store.save(f)
+            if not stored.created:
+                reclaimed += stored.size
+            document.file_path = stored.path
+            document.content_hash = stored.digest
+            document.file_size = stored.size
+            legacy_paths.add(legacy_path)
+            updated += 1
+        db.session.commit()
+
+        # Files are removed only after the commit, and only when no row names them any more
+        # (a row in a later batch keeps its file until that batch moves it)
+        if legacy_paths:
+            still_used = {
+                path for path, in db.session.query(Document.file_path)
+                .filter(Document.file_path.in_(legacy_paths))
+                .distinct()
+            }
+            for legacy_path in legacy_paths - still_used:
+                os.unlink(legacy_path)
+    return updated, reclaimed, missing
+
+
+@click.command('migrate-uploads')
+@click.option('--batch-size', default=500, show_default=True)
+@with_appcontext
+def migrate_uploads_command(batch_size):
+    """Move pre-existing flat UPLOAD_FOLDER files into the content-addressed store."""
+    updated, reclaimed, missing = migrate_legacy_uploads(batch_size)
+    click.echo(f'{updated} documents moved, {reclaimed} bytes reclaimed, {missing} files missing.')
+
+
+@click.command('expire-uploads')
+@click.option('--ttl', type=int, default=None, help='Idle seconds before a session is removed (default: UPLOAD_SESSION_TTL).')
+@with_appcontext
+def expire_uploads_command(ttl):
+    """Garbage-collect stale resumable upload sessions and their partial files. Run from cron."""
+    sessions, files, reclaimed = expire_stale_uploads(ttl)
+    click.echo(f'{sessions} upload sessions expired, {files} temp files removed, {reclaimed} bytes reclaimed.')
+
+
+def init_upload_store(app):
+    """Register the legacy upload migration and stale upload cleanup commands."""
+    app.cli.add_command(migrate_uploads_command)
+    app.cli.add_command(expire_uploads_command)
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select, func, case, and_, or_
+from extensions import db
+from models import Loan, RepaymentRecord, LoanDelinquency, DelinquencyRun
+
+DISBURSED_STATUSES = ('approved', 'defaulted')
+SEGMENTS = {
+    'term': 'term_band',
+    'purpose': 'purpose_category',
+}
+TERM_BANDS = [13, 26, 52]  # repayment periods
+
+
+def _term_band(term):
+    bands = np.asarray(TERM_BANDS)
+    labels = [f'<={TERM_BANDS[0]}'] + [f'{low + 1}-{high}' for low, high in zip(TERM_BANDS, TERM_BANDS[1:])]
+    labels.append(f'>{TERM_BANDS[-1]}')
+    index = np.searchsorted(bands, term.fillna(0).to_numpy(), side='left')
+    return pd.Series(np.asarray(labels, dtype=object)[index], index=term.index)
+
+
+def _month_number(values):
+    """Months since year 0 for a datetime Series, so month differences are integer subtraction."""
+    values = pd.to_datetime(values)
+    return values.dt.year * 12 + values.dt.month - 1
+
+
+def _payment_month():
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(RepaymentRecord.payment_date, 'YYYY-MM')
+    return func.strftime('%Y-%m', RepaymentRecord.payment_date)
+
+
+def _cache_folder():
+    folder = current_app.config['VINTAGE_CACHE_FOLDER'] or os.path.join(current_app.instance_path, 'vintage')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _write_atomic(path, write):
+    """Write a cache file through a temp file in the same folder so other workers never read a partial one."""
+    fd, temp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _remove(path):
+    # Another worker may have removed it first
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_json(data):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    return write
+
+
+def data_watermark():
+    """Cheap fingerprint of everything the curves depend on; any write to the inputs changes it."""
+    loans = db.session.query(
+        func.count(Loan.id),
+        func.max(Loan.id),
+        func.max(Loan.approved_at),
+        func.max(Loan.updated_at),
+        func.sum(case((Loan.status.in_(DISBURSED_STATUSES), 1), else_=0))
+    ).one()
+    repayments = db.session.query(func.count(RepaymentRecord.id), func.max(RepaymentRecord.id)).one()
+    delinquency_run = db.session.query(func.max(DelinquencyRun.id))\
+        .filter(DelinquencyRun.status == 'completed')\
+        .scalar()
+    return {
+        'loans': [loans[0], loans[1], str(loans[2]), str(loans[3]), int(loans[4] or 0)],
+        'repayments': [repayments[0], repayments[1]],
+        'delinquency_run': delinquency_run,
+    }
+
+
+def extract_loans():
+    """Columnar extract of disbursed loans with their origination and (90+ DPD) default dates."""
+    default_after = current_app.config['DELINQUENCY_BUCKETS'][-1]
+    query = select(
+        Loan.id.label('loan_id'),
+        func.coalesce(Loan.approved_at, Loan.created_at).label('originated_at'),
+        Loan.amount,
+        Loan.term,
+        func.coalesce(Loan.purpose_category, 'Other').label('purpose_category'),
+        LoanDelinquency.oldest_unpaid_due_date,
+        LoanDelinquency.days_past_due,
+    ).outerjoin(LoanDelinquency, LoanDelinquency.loan_id == Loan.id)\
+        .where(Loan.status.in_(DISBURSED_STATUSES))
+
+    loans = pd.read_sql(query, db.session.connection())
+    loans['amount'] = loans['amount'].astype(float)
+    loans['origination_month'] = _month_number(loans['originated_at'])
+    loans['term_band'] = _term_band(loans['term'])
+
+    # A loan defaults on the day its oldest unpaid instalment reaches the last bucket edge
+    defaulted = loans['days_past_due'].fillna(0) >= default_after
+    default_date = pd.to_datetime(loans['oldest_unpaid_due_date']) + pd.Timedelta(days=default_after)
+    loans['default_month'] = _month_number(default_date.where(defaulted))
+    return loans.drop(columns=['oldest_unpaid_due_date', 'days_past_due'])
+
+
+def _month_partitions(folder):
+    """Repayments summed per loan and payment month, one Feather file per month.
+
+    A month's file is rebuilt only when its row count or highest id changed, so
+    each refresh reads just the new (or back-dated) months from the database.
+    """
+    manifest_path = os.path.join(folder, 'repayment_months.json')
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    month = _payment_month()
+    current = {
+        key: [count, max_id]
+        for key, count, max_id in db.session.query(month, func.count(RepaymentRecord.id), func.max(RepaymentRecord.id))
+        .group_by(month)
+    }
+
+    stale = [
+        key for key, stats in current.items()
+        if manifest.get(key) != stats or not os.path.exists(os.path.join(folder, f'repayments_{key}.feather'))
+    ]
+    # Every month that needs rebuilding comes from one grouped query, split per month below
+    rebuilt = {}
+    if stale:
+        ranges = []
+        for key in stale:
+            start = datetime.strptime(key, '%Y-%m')
+            end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+            ranges.append(and_(RepaymentRecord.payment_date >= start, RepaymentRecord.payment_date < end))
+        fresh = pd.read_sql(
+            select(month.label('month'), RepaymentRecord.loan_id, func.sum(RepaymentRecord.amount).label('amount'))
+            .where(or_(*ranges))
+            .group_by(month, RepaymentRecord.loan_id),
+            db.session.connection()
+        )
+        fresh['amount'] = fresh['amount'].astype(float)
+        for key, frame in fresh.groupby('month'):
+            start = datetime.strptime(key, '%Y-%m')
+            frame = frame.drop(columns='month').reset_index(drop=True)
+            frame['payment_month'] = start.year * 12 + start.month - 1
+            rebuilt[key] = frame
+
+    frames = []
+    for key in sorted(current):
+        path = os.path.join(folder, f'repayments_{key}.feather')
+        if key in rebuilt:
+            frame = rebuilt[key]
+            _write_atomic(path, frame.to_feather)
+        elif key in stale:
+            # Its rows were deleted after the month counts were read
+            continue
+        else:
+            frame = pd.read_feather(path)
+        frames.append(frame)
+
+    for key in set(manifest) - set(current):
+        _remove(os.path.join(folder, f'repayments_{key}.feather'))
+    _write_atomic(manifest_path, _write_json(current))
+
+    if not frames:
+        return pd.DataFrame({'loan_id': [], 'amount': [], 'payment_month': []})
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_curves(loans, repayments, segment=None, max_months=24, now=None):
+    """Cumulative repayment and default curves per origination-month cohort.
+
+    Args:
+        loans: Frame from extract_loans
+        repayments: Frame of loan_id, amount and payment_month
+        segment: None, 'term' or 'purpose' to split each vintage further
+        max_months: Months on book to report
+        now: Reference time; months a cohort has not reached yet are left empty
+
+    Returns:
+        Long frame with one row per cohort and month on book: loans, disbursed,
+        repaid_pct and default_pct (cumulative, in percent)
+    """
+    keys = ['origination_month'] + ([SEGMENTS[segment]] if segment else [])
+    now = now or datetime.utcnow()
+    current_month = now.year * 12 + now.month - 1
+    months = np.arange(max_months + 1)
+
+    cohorts = loans.groupby(keys).agg(loans=('loan_id', 'size'), disbursed=('amount', 'sum'))
+    grid = pd.MultiIndex.from_tuples(
+        [(*(cohort if isinstance(cohort, tuple) else (cohort,)), m) for cohort in cohorts.index for m in months],
+        names=keys + ['month_on_book']
+    )
+
+    paid = repayments.merge(loans[['loan_id'] + keys], on='loan_id')
+    paid['month_on_book'] = (paid['payment_month'] - paid['origination_month']).clip(lower=0)
+    paid = paid[paid['month_on_book'] <= max_months]\
+        .groupby(keys + ['month_on_book'])['amount'].sum()\
+        .reindex(grid, fill_value=0.0)
+
+    defaults = loans.dropna(subset=['default_month']).copy()
+    defaults['month_on_book'] = (defaults['default_month'] - defaults['origination_month']).clip(lower=0)
+    defaults = defaults[defaults['month_on_book'] <= max_months]\
+        .groupby(keys + ['month_on_book'])['loan_id'].size()\
+        .reindex(grid, fill_value=0)
+
+    curves = pd.DataFrame({'repaid': paid, 'defaulted': defaults.astype(float)})
+    curves[['repaid', 'defaulted']] = curves.groupby(level=keys)[['repaid', 'defaulted']].cumsum()
+    curves = curves.reset_index().merge(cohorts.reset_index(), on=keys)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curves['repaid_pct'] = np.where(curves['disbursed'] > 0, curves['repaid'] / curves['disbursed'] * 100, 0.0)
+        curves['default_pct'] = curves['defaulted'] / curves['loans'] * 100
+
+    unobserved = curves['origination_month'] + curves['month_on_book'] > current_month
+    curves.loc[unobserved, ['repaid_pct', 'default_pct']] = np.nan
+    return curves.drop(columns=['repaid', 'defaulted'])
+
+
+def vintage_curves(segment=None):
+    """Curves for `segment`, served from the Parquet cache while the data watermark is unchanged."""
+    if segment is not None and segment not in SEGMENTS:
+        raise ValueError(f"segment must be one of: {', '.join(SEGMENTS)}")
+
+    max_months = current_app.config['VINTAGE_MAX_MONTHS_ON_BOOK']
+    folder = _cache_folder()
+    fingerprint = json.dumps({
+        'watermark': data_watermark(),
+        'segment': segment,
+        'max_months': max_months,
+        'buckets': current_app.config['DELINQUENCY_BUCKETS'],
+        'month': datetime.utcnow().strftime('%Y-%m'),
+    }, sort_keys=True)
+    prefix = f"curves_{segment or 'all'}_"
+    path = os.path.join(folder, f"{prefix}{hashlib.sha1(fingerprint.encode()).hexdigest()[:16]}.parquet")
+
+    try:
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        pass
+
+    curves = compute_curves(extract_loans(), _month_partitions(folder), segment, max_months)
+    _write_atomic(path, lambda temp_path: curves.to_parquet(temp_path, index=False))
+
+    # Results for older watermarks can never be served again
+    for name in os.listdir(folder):
+        if name.startswith(prefix) and os.path.join(folder, name) != path:
+            _remove(os.path.join(folder, name))
+    return curves
+
+
+def _month_label(month_number):
+    return f'{int(month_number) // 12}-{int(month_number) % 12 + 1:02d}'
+
+
+def vintage_context(segment=None, vintages=12):
+    """Template context for the vintage view: curves of the most recent `vintages` origination months."""
+    curves = vintage_curves(segment)
+    keys = ['origination_month'] + ([SEGMENTS[segment]] if segment else [])
+    recent = sorted(curves['origination_month'].unique())[-vintages:]
+    curves = curves[curves['origination_month'].isin(recent)]
+
+    cohorts = []
+    for key, group in curves.groupby(keys, sort=True):
+        key = key if isinstance(key, tuple) else (key,)
+        group = group.sort_values('month_on_book')
+        cohorts.append({
+            'label': _month_label(key[0]) + (f' / {key[1]}' if segment else ''),
+            'loans': int(group['loans'].iloc[0]),
+            'disbursed': float(group['disbursed'].iloc[0]),
+            'repayment_curve': [None if pd.isna(v) else round(float(v), 2) for v in group['repaid_pct']],
+            'default_curve': [None if pd.isna(v) else round(float(v), 2) for v in group['default_pct']],
+        })
+
+    return {
+        'segment': segment,
+        'segments': list(SEGMENTS),
+        'months_on_book': list(range(current_app.config['VINTAGE_MAX_MONTHS_ON_BOOK'] + 1)),
+        'cohorts': cohorts,
+    }